@@ -0,0 +1,204 @@
+import MazeGenerator as mg
+from GeneticAlgorithm import Genome
+from MazeRenderer import MazeRendered
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import subprocess
+import sys
+import time
+import numpy as np
+
+
+DEFAULT_SIZES           = [15, 63, 255, 1023]
+DEFAULT_METHODS         = [mg.USE_GENE_POOL_1, mg.USE_GENE_POOL_2]
+DEFAULT_POPULATIONS     = [10, 50, 200]
+DEFAULT_GENERATIONS     = 2     # Generations of each timed GA run
+DEFAULT_SAMPLES         = 5     # Genomes used to time each stage separately
+DEFAULT_SEED            = 0
+
+
+def get_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_peak_rss():
+    # Unix only (None on Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS (fitness workers are counted as children)
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale
+
+
+def time_calls(function, values):
+    # Time each call, return the results and the timing summary
+    results = []
+    timings = []
+
+    for value in values:
+        start = time.perf_counter()
+        results.append(function(value))
+        timings.append(time.perf_counter() - start)
+
+    summary = {
+        "calls": len(timings),
+        "total": sum(timings),
+        "mean": sum(timings) / len(timings),
+        "min": min(timings),
+    }
+    return results, summary
+
+
+def run_case(case, env_file):
+    # Apply the case on top of the .env settings (mode flags like VECTORIZED_GA or FAST_SEARCH)
+    mg.load_parameters(env_file)
+    mg.set_parameters({
+        "METHOD_TO_USE": case["method"],
+        "MAZE_HEIGHT": case["size"],
+        "MAZE_WIDTH": case["size"],
+        "MAZE_END": (case["size"] - 1, case["size"] - 2),
+        "POPULATION_SIZE": case["population_size"],
+        "MAX_GENERATIONS": case["generations"],
+        "SEED": case["seed"],
+    })
+    mg.check_parameters()
+
+    # Time each stage on the same sample genomes
+    genome_length, gene_pool = mg.get_genome_properties()
+    rng = random.Random(case["seed"])
+    genomes = []
+
+    for i in range(case["samples"]):
+        genome = Genome(genome_length, gene_pool, rng, mg.PACKED_GENOMES)
+        genome.set_random_genome()
+        genomes.append(genome)
+
+    stages = {}
+    mazes, stages["genome_to_maze"] = time_calls(lambda g: mg.genome_to_maze(g.get_genome()), genomes)
+    scores, stages["fitness"] = time_calls(mg.fitness, genomes)
+
+    # Search instances can be shared (FAST_SEARCH), each one is run as soon as it is created
+    _, stages["search"] = time_calls(lambda pair: mg.create_search_algorithm(pair[0], pair[1].get_genome()).run(), list(zip(mazes, genomes)))
+
+    renderers = [MazeRendered(mg.MAZE_HEIGHT, mg.MAZE_WIDTH, list(m), [], [], []) for m in mazes]
+    # Blocks are generated while they are consumed
+    _, stages["maze_blocks"] = time_calls(lambda mr: sum(1 for block in mr._get_maze_blocks(0, 0, 0)), renderers)
+
+    # Time a whole run (initial population and generations)
+    ga = mg.create_genetic_algorithm()
+    ga.set_profiling(True)
+    start = time.perf_counter()
+    ga.run()
+    elapsed = time.perf_counter() - start
+    ga.close()
+
+    # Stop criteria of the .env file can end the run early, elites and cached scores skip the fitness
+    generations = ga.get_generations()
+    evaluations = ga.get_fitness_calls()
+
+    return {
+        **case,
+        "stages": stages,
+        "ga_run": elapsed,
+        "ga_stages": ga.get_stage_totals(),
+        "best_score": float(ga.get_best_genome().get_score()),
+        "stop_reason": ga.get_stop_reason(),
+        "generations_per_second": generations / elapsed,
+        "fitness_evals_per_second": evaluations / elapsed,
+        "peak_rss_bytes": get_peak_rss(),
+    }
+
+
+def run_case_process(case, env_file, connection):
+    try:
+        connection.send(run_case(case, env_file))
+    except Exception as e:
+        connection.send({**case, "error": str(e)})
+    connection.close()
+
+
+def run_isolated(case, env_file):
+    # One fresh process per case, so the peak RSS only covers that case
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=run_case_process, args=(case, env_file, sender))
+    process.start()
+    sender.close()
+
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {**case, "error": "Benchmark process exited with code " + str(process.exitcode)}
+
+    process.join()
+    return result
+
+
+def get_cases(args):
+    cases = []
+    for method in args.methods:
+        for size in args.sizes:
+            for population_size in args.populations:
+                cases.append({
+                    "method": method,
+                    "size": size,
+                    "population_size": population_size,
+                    "generations": args.generations,
+                    "samples": args.samples,
+                    "seed": args.seed,
+                })
+    return cases
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description="Time the maze generator stages over a matrix of settings")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Maze heights/widths (square mazes)")
+    parser.add_argument("--methods", type=int, nargs="+", default=DEFAULT_METHODS, help="Gene pools (1 and/or 2)")
+    parser.add_argument("--populations", type=int, nargs="+", default=DEFAULT_POPULATIONS, help="Population sizes")
+    parser.add_argument("--generations", type=int, default=DEFAULT_GENERATIONS, help="Generations of each GA run")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="Genomes used to time each stage")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed of every case")
+    parser.add_argument("--env", default=".env", help="Settings file applied to every case (mode flags)")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: standard output)")
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+
+    results = []
+    for case in get_cases(args):
+        print("## Case: " + json.dumps(case), file=sys.stderr)
+        results.append(run_isolated(case, args.env))
+
+    report = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "env": args.env,
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output != None:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
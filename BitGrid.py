@@ -0,0 +1,100 @@
+_UNPACKED = [bytes((byte >> (7 - bit)) & 1 for bit in range(8)) for byte in range(256)] # Byte -> 8 tiles
+_PACKED = {tiles: byte for byte, tiles in enumerate(_UNPACKED)}                         # 8 tiles -> byte
+
+
+class BitGrid:
+    def __init__(self, length, data=None):
+        self.length = length    # Number of tiles (bits)
+        self.data = bytearray((length + 7) // 8) if data == None else bytearray(data) # One bit per tile, first tile in the high bit
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return (self.data[index >> 3] >> (7 - (index & 7))) & 1
+
+    def __setitem__(self, index, value):
+        mask = 0x80 >> (index & 7)
+        if value:
+            self.data[index >> 3] |= mask
+        else:
+            self.data[index >> 3] &= ~mask & 0xFF
+
+    def __iter__(self):
+        return iter(self.unpack())
+
+    def __bytes__(self):
+        return bytes(self.data)
+
+    def __eq__(self, other):
+        return isinstance(other, BitGrid) and self.length == other.length and self.data == other.data
+
+    # Public
+    @staticmethod
+    def from_list(tiles):
+        # Pack 8 tiles per byte (missing tiles of the last byte are 0)
+        tiles = bytes(tiles)
+        padding = bytes(-len(tiles) % 8)
+        tiles += padding
+
+        grid = BitGrid(len(tiles) - len(padding))
+        grid.data = bytearray(_PACKED[tiles[i:i + 8]] for i in range(0, len(tiles), 8))
+        return grid
+
+    @staticmethod
+    def random(length, rng):
+        grid = BitGrid(length)
+        if length > 0:
+            grid.data = bytearray(rng.getrandbits(len(grid.data) * 8).to_bytes(len(grid.data), "big"))
+            grid.data[-1] &= (0xFF << (-length % 8)) & 0xFF
+        return grid
+
+    def count(self, value):
+        ones = bin(int.from_bytes(self.data, "big")).count("1") # int.bit_count needs Python 3.10
+        return ones if value else self.length - ones
+
+    def copy(self):
+        return BitGrid(self.length, self.data)
+
+    def copy_range(self, source, start, stop):
+        # Copy tiles [start, stop) from another grid of the same length (whole bytes are sliced)
+        if start >= stop:
+            return
+
+        first = start >> 3
+        last = (stop - 1) >> 3
+        head_mask = 0xFF >> (start & 7)
+        tail_mask = (0xFF << (7 - ((stop - 1) & 7))) & 0xFF
+
+        if first == last:
+            mask = head_mask & tail_mask
+            self.data[first] = (self.data[first] & ~mask & 0xFF) | (source.data[first] & mask)
+            return
+
+        self.data[first] = (self.data[first] & ~head_mask & 0xFF) | (source.data[first] & head_mask)
+        self.data[first + 1:last] = source.data[first + 1:last]
+        self.data[last] = (self.data[last] & ~tail_mask & 0xFF) | (source.data[last] & tail_mask)
+
+    def differences(self, other, start, stop):
+        # Indices of the tiles in [start, stop) that differ from another grid
+        result = []
+        if start >= stop:
+            return result
+
+        for byte in range(start >> 3, ((stop - 1) >> 3) + 1):
+            diff = self.data[byte] ^ other.data[byte]
+            while diff:
+                bit = diff.bit_length() - 1
+                index = byte * 8 + 7 - bit
+                if start <= index < stop:
+                    result.append(index)
+                diff &= ~(1 << bit)
+
+        return result
+
+    def to_list(self):
+        return list(self.unpack())
+
+    def unpack(self):
+        # One byte per tile, fast to index (e.g. for a search)
+        return b"".join(map(_UNPACKED.__getitem__, self.data))[:self.length]
@@ -1,21 +1,83 @@
 import random
+import hashlib
+import heapq
+import json
+import time
+import multiprocessing
+import queue
+from bisect import bisect_left
+from itertools import accumulate
+from collections import OrderedDict
+import numpy as np
+from BitGrid import *
+
+
+SELECTION_ROULETTE      = "roulette"   # Probability proportional to the score
+SELECTION_TOURNAMENT    = "tournament" # Best of a few random individuals
+SELECTION_SUS           = "sus"        # Stochastic universal sampling (evenly spaced pointers on the roulette)
+SELECTIONS              = [SELECTION_ROULETTE, SELECTION_TOURNAMENT, SELECTION_SUS]
+
+REASON_MAX_GENERATIONS  = "max_generations"   # All generations were created
+REASON_STAGNATION       = "stagnation"        # Best score did not improve during the stagnation window
+REASON_TARGET_SCORE     = "target_score"      # Best score reached the target
+REASON_TIME_BUDGET      = "time_budget"       # Run took longer than the time budget
+REASON_EVALUATION_BUDGET = "evaluation_budget" # Fitness was called at least as many times as the budget
+
+TOPOLOGY_RING           = "ring" # Each island sends its migrants to the next one
+TOPOLOGY_FULL           = "full" # Each island sends its migrants to all the other ones
+TOPOLOGIES              = [TOPOLOGY_RING, TOPOLOGY_FULL]
+
+_worker = {} # State of a fitness worker process (set once by _init_worker)
+
+
+def _init_worker(genome_length, gene_pool, fitness, fitness_batch, initializer, initargs):
+    _worker["genome_length"] = genome_length
+    _worker["gene_pool"] = gene_pool
+    _worker["fitness"] = fitness
+    _worker["fitness_batch"] = fitness_batch
+
+    # Configure the worker once (e.g. the parameters used by the fitness function)
+    if initializer != None:
+        initializer(*initargs)
+
+
+def _evaluate_chunk(chunk):
+    genomes = []
+    for genes in chunk:
+        genome = Genome(_worker["genome_length"], _worker["gene_pool"])
+        genome.set_genome(genes)
+        genomes.append(genome)
+
+    if _worker["fitness_batch"] != None:
+        return list(_worker["fitness_batch"](genomes))
+
+    return [_worker["fitness"](genome) for genome in genomes]
 
 
 class Genome:
-    def __init__(self, genome_length, gene_pool):
-        self.genome = []                    # Represents all genes as a list
+    def __init__(self, genome_length, gene_pool, rng=None, packed=False):
+        self.genome = []                    # Represents all genes as a list (or a BitGrid when packed)
         self.genome_length = genome_length  # Genome size (how many genes it has)
         self.gene_pool = gene_pool          # List of possible genes
         self.score = 0                      # Genome score (calculated in the fitness function)
+        self.rng = rng if rng != None else random # Random generator (global one by default)
+        self.packed = packed                # One bit per gene (gene pool must be 0 and 1)
+
+        self.parent = None                  # Scored parent this genome derives from (until it is scored)
+        self.changes = None                 # Indices of the genes that may differ from the parent
+        self.data = None                    # Data attached by the fitness function (e.g. to reuse work)
 
     # Public
     def get_random_gene(self):
-        return random.choice(self.gene_pool)
+        return self.rng.choice(self.gene_pool)
 
     def get_other_random_gene(self, index):        
+        if self.packed:
+            return 1 - self.genome[index]
+
         gene_pool = self.gene_pool.copy()
         gene_pool.remove(self.genome[index])
-        return random.choice(gene_pool)
+        return self.rng.choice(gene_pool)
 
     def get_genome(self):
         return self.genome
@@ -23,13 +85,61 @@ class Genome:
     def get_score(self):
         return self.score
 
+    def get_parent(self):
+        return self.parent
+
+    def get_changes(self):
+        return self.changes
+
+    def get_data(self):
+        return self.data
+
     def set_gene(self, index, gene):
         self.genome[index] = gene
+        if self.changes != None:
+            self.changes.append(index)
+
+    def set_origin(self, parent, changes):
+        self.parent = parent
+        self.changes = changes
+
+    def set_data(self, data):
+        self.data = data
 
     def set_genome(self, genome):
         self.genome = genome
 
+    def set_empty_genome(self):
+        # Storage for the genes, to be overwritten (e.g. by a crossover)
+        if self.packed:
+            self.genome = BitGrid(self.genome_length)
+        else:
+            self.genome = [self.gene_pool[0]] * self.genome_length
+
+    def copy_from(self, other):
+        # Copy the genes (in place when the storage fits), the score and the data of another genome
+        genes = other.get_genome()
+        if type(self.genome) != type(genes) or len(self.genome) != len(genes):
+            self.genome = genes.copy()
+        elif self.packed:
+            self.genome.copy_range(genes, 0, len(genes))
+        else:
+            self.genome[:] = genes
+
+        self.score = other.get_score()
+        self.data = other.get_data()
+        self.set_origin(None, None)
+
+    def copy(self):
+        genome = Genome(self.genome_length, self.gene_pool, self.rng, self.packed)
+        genome.copy_from(self)
+        return genome
+
     def set_random_genome(self):
+        if self.packed:
+            self.genome = BitGrid.random(self.genome_length, self.rng)
+            return
+
         self.genome = []
         for i in range(self.genome_length):
             self.genome.append(self.get_random_gene())
@@ -39,17 +149,53 @@ class Genome:
 
 
 class GeneticAlgorithm:
-    def __init__(self, genome_length, gene_pool, population_size, max_generations, fitness):
+    def __init__(self, genome_length, gene_pool, population_size, max_generations, fitness, seed=None):
         self.genome_length = genome_length  # Genome size of each individual
         self.gene_pool = gene_pool          # List of possible genes
         self.population_size = population_size # Population size of each generation
         self.max_generations = max_generations # Number of generations (stopping criterion)
         self.fitness = fitness                 # "Pointer" to the fitness function to use
+        self.fitness_batch = None              # "Pointer" to the batch fitness function (preferred when set)
+
+        self.workers = 0            # Number of fitness worker processes (0 or 1 -> serial)
+        self.worker_initializer = None # Function called once in each worker (e.g. to load parameters)
+        self.worker_initargs = ()   # Arguments of the worker initializer
+        self.pool = None            # Persistent process pool (created on first use)
+
+        self.cache_size = 0         # Max number of cached scores (0 -> no cache)
+        self.cache = OrderedDict()  # Scores by genome key, least recently used first
+        self.cache_hits = 0         # Number of scores read from the cache
+        self.cache_misses = 0       # Number of scores computed by the fitness
+
+        self.track_changes = False  # Record the genes changed relative to the first parent
+        self.packed = False         # Genomes as BitGrid (one bit per gene)
+
+        self.profiling = False      # Time the stages and keep statistics of each generation
+        self.trace_path = None      # JSON-lines file receiving the statistics of each generation
+        self.trace_file = None      # Open trace file (during a run)
+        self.callbacks = []         # Functions called with the statistics of each generation
+        self.stage_times = {}       # Seconds spent in each stage of the current generation
+        self.generation_start = 0   # Start time of the current generation
+        self.generation_stats = []  # Statistics of each generation of the last run
+        self.fitness_calls = 0      # Number of genomes scored by the fitness (cached scores excluded)
+        self.fitness_calls_start = 0 # Fitness calls at the start of the current generation
+        self.cache_hits_start = 0   # Cache hits at the start of the current generation
         
         self.crossover_points = [int(1.0 / 2.0 * self.genome_length)] # Crossover points (default 1 point in the middle)
         self.mutation_probability = 1.0 / 100.0                       # Mutation probability (default 1%)
 
+        self.selection = SELECTION_ROULETTE # Parent selection strategy
+        self.tournament_size = 2    # Individuals competing in each tournament
+        self.cumulative_scores = [] # Prefix sums of the scores of the population (roulette and SUS)
+        self.selected = []          # Parents drawn for the whole generation (SUS)
+
+        self.seed_sequence = None   # Seed of the run and of its substreams
+        self.random = None          # Random generator of this instance (reset at each run)
+        self.set_seed(seed)
+
         self.population = [] # The individuals for each generation
+        self.spare = []      # Preallocated individuals receiving the next generation (swapped with the population)
+        self.elite_size = 0  # Best individuals copied to the next generation without being evaluated again
         self.total_score = 0 # The total score for the current generation
         self.parents = []    # The parents for the current selection
         self.child = None    # The current generated child
@@ -57,87 +203,463 @@ class GeneticAlgorithm:
         self.best_score = 0     # Keep track of the best score accross generations
         self.best_genome = None # Keep track of the best genome accross generations
 
+        self.stagnation_window = 0  # Generations without improvement before stopping (0 -> no limit)
+        self.target_score = None    # Best score to reach before stopping (None -> no target)
+        self.time_budget = 0        # Seconds a run can take before stopping (0 -> no limit)
+        self.evaluation_budget = 0  # Fitness calls a run can make before stopping (0 -> no limit)
+        self.run_start = 0          # Start time of the current run
+        self.generation = 0         # Generations created in the current run
+        self.last_improvement = 0   # Generation of the last best score improvement
+        self.stop_reason = None     # Criterion that ended the last run
+        self.migration = None       # Function called with this instance after each generation (e.g. island migration)
+
     # Private
+    def _prepare_selection(self):
+        # Once per generation: prefix sums of the scores, and all the parents for SUS
+        if self.selection == SELECTION_TOURNAMENT or self.total_score == 0:
+            return
+
+        self.cumulative_scores = list(accumulate(genome.get_score() for genome in self.population))
+
+        if self.selection == SELECTION_SUS:
+            count = 2 * (self.population_size - self.elite_size)
+            spacing = self.total_score / count
+            start = self.random.uniform(0, spacing)
+
+            self.selected = [self._roulette_pick(start + i * spacing) for i in range(count)]
+            self.random.shuffle(self.selected)
+
+    def _roulette_pick(self, rnd):
+        # First individual whose cumulative score reaches rnd (binary search)
+        index = bisect_left(self.cumulative_scores, rnd)
+        return self.population[min(index, self.population_size - 1)]
+
+    def _tournament_pick(self):
+        best = None
+        for i in range(self.tournament_size):
+            genome = self.population[self.random.randrange(self.population_size)]
+            if best == None or genome.get_score() > best.get_score():
+                best = genome
+        return best
+
     def _selection(self):
-        parent_1_index = None
-        parent_2_index = None
+        if self.selection == SELECTION_TOURNAMENT:
+            self.parents = [self._tournament_pick(), self._tournament_pick()]
+            return
 
         # When total score is 0, choose two parents randomly
         if self.total_score == 0:
-            self.parents = random.sample(self.population, 2)
+            self.parents = self.random.sample(self.population, 2)
             return
 
-        # Select first parent
-        cumulative = 0
-        rnd = random.uniform(0, self.total_score)
-
-        for i in range(self.population_size):
-            genome = self.population[i]
-            cumulative += genome.get_score()
-            if rnd <= cumulative:
-                parent_1_index = i
-                break
-        
-        # Select second parent (can be the same as the first one)
-        cumulative = 0
-        rnd = random.uniform(0, self.total_score)
+        if self.selection == SELECTION_SUS:
+            self.parents = [self.selected.pop(), self.selected.pop()]
+            return
 
-        for i in range(self.population_size):
-            genome = self.population[i]
-            cumulative += genome.get_score()
-            if rnd <= cumulative:
-                parent_2_index = i
-                break
-        
-        parent_1_genome = self.population[parent_1_index]
-        parent_2_genome = self.population[parent_2_index]
+        # Select both parents (second one can be the same as the first one)
+        parent_1_genome = self._roulette_pick(self.random.uniform(0, self.total_score))
+        parent_2_genome = self._roulette_pick(self.random.uniform(0, self.total_score))
 
         self.parents = [parent_1_genome, parent_2_genome]
     
+    def _crossover_packed(self):
+        parent_1_genome = self.parents[0].get_genome()
+        parent_2_genome = self.parents[1].get_genome()
+        child_genome = self.child.get_genome()
+        child_genome.copy_range(parent_1_genome, 0, self.genome_length)
+
+        # Genes differing from the first parent
+        changes = [] if self.track_changes else None
+
+        # Copy the segments of the second parent (slices of packed bytes)
+        is_current_parent_1 = True
+        start = 0
+        for point in self.crossover_points + [self.genome_length]:
+            if not is_current_parent_1:
+                if changes != None:
+                    changes.extend(parent_1_genome.differences(parent_2_genome, start, point))
+                child_genome.copy_range(parent_2_genome, start, point)
+
+            start = point
+            is_current_parent_1 = not is_current_parent_1
+
+        if changes != None:
+            self.child.set_origin(self.parents[0], changes)
+
     def _crossover(self):
-        child_genome = []
+        if self.packed:
+            self._crossover_packed()
+            return
+
+        # The child genes are overwritten in place (preallocated storage)
+        child_genome = self.child.get_genome()
 
         is_current_parent_1 = True
         parent_1_genome = self.parents[0].get_genome()
         parent_2_genome = self.parents[1].get_genome()
 
-        # Copy to points
-        i = 0
-        for p in range(len(self.crossover_points)):
-            crossover_point = self.crossover_points[p]
-
-            while i < crossover_point:
-                gene = parent_1_genome[i]
-                if not is_current_parent_1:
-                    gene = parent_2_genome[i]                
-                
-                child_genome.append(gene)
-                i += 1
-            
-            is_current_parent_1 = not is_current_parent_1
+        # Genes differing from the first parent
+        changes = [] if self.track_changes else None
 
-        # Copy the remaining genes (from last point)
-        while len(child_genome) < self.genome_length:
-            gene = parent_1_genome[i]
-            if not is_current_parent_1:
-                gene = parent_2_genome[i]
+        # Copy each segment, up to each point then to the end
+        start = 0
+        for point in self.crossover_points + [self.genome_length]:
+            if is_current_parent_1:
+                child_genome[start:point] = parent_1_genome[start:point]
+            else:
+                child_genome[start:point] = parent_2_genome[start:point]
+                if changes != None:
+                    changes.extend(i for i in range(start, point) if parent_2_genome[i] != parent_1_genome[i])
 
-            child_genome.append(gene)
-            i += 1
+            start = point
+            is_current_parent_1 = not is_current_parent_1
 
-        self.child = Genome(self.genome_length, self.gene_pool)
-        self.child.set_genome(child_genome)
+        if changes != None:
+            self.child.set_origin(self.parents[0], changes)
 
     def _mutation(self):
         for i in range(self.genome_length):
-            if random.random() < self.mutation_probability:
+            if self.random.random() < self.mutation_probability:
                 rnd_gene = self.child.get_other_random_gene(i)
                 self.child.set_gene(i, rnd_gene)
 
+    def _get_pool(self):
+        if self.pool == None:
+            self.pool = multiprocessing.Pool(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(
+                    self.genome_length, self.gene_pool, self.fitness, self.fitness_batch,
+                    self.worker_initializer, self.worker_initargs
+                )
+            )
+        return self.pool
+
+    def _evaluate_parallel(self, genomes):
+        # Split the genomes into one chunk per worker (genes only, to keep messages small)
+        chunk_size = -(-len(genomes) // self.workers)
+        chunks = []
+        for i in range(0, len(genomes), chunk_size):
+            chunks.append([genome.get_genome() for genome in genomes[i:i + chunk_size]])
+
+        scores = []
+        for chunk_scores in self._get_pool().map(_evaluate_chunk, chunks):
+            scores.extend(chunk_scores)
+        return scores
+
+    def _reset_random(self):
+        self.random = random.Random(self.seed_sequence.entropy)
+
+    def _get_genome_key(self, genome):
+        # Compact hash of the genes (one byte per gene when possible)
+        genes = genome.get_genome()
+        try:
+            data = bytes(genes)
+        except (TypeError, ValueError):
+            data = repr(genes).encode()
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def _evaluate_cached(self, genomes):
+        # Read known scores, and evaluate each unknown genome only once
+        pending = OrderedDict()
+        for genome in genomes:
+            key = self._get_genome_key(genome)
+
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                genome.set_score(self.cache[key])
+                self.cache_hits += 1
+            elif key in pending:
+                pending[key].append(genome)
+                self.cache_hits += 1
+            else:
+                pending[key] = [genome]
+                self.cache_misses += 1
+
+        evaluated = [same[0] for same in pending.values()]
+        self._evaluate_all(evaluated)
+
+        for key, same in pending.items():
+            score = same[0].get_score()
+            for genome in same[1:]:
+                genome.set_score(score)
+
+            # Keep the most recent scores only
+            self.cache[key] = score
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def _evaluate_all(self, genomes):
+        # Every genome can be a cache hit (e.g. elites and duplicates only)
+        if len(genomes) == 0:
+            return
+
+        scores = None
+        self.fitness_calls += len(genomes)
+
+        # Use the worker processes, else prefer the batch fitness (one call for all genomes)
+        if self.workers > 1:
+            scores = self._evaluate_parallel(genomes)
+        elif self.fitness_batch != None:
+            scores = self.fitness_batch(genomes)
+        else:
+            scores = [self.fitness(genome) for genome in genomes]
+
+        for genome, score in zip(genomes, scores):
+            genome.set_score(score)
+
+    def _evaluate(self, genomes):
+        if self.cache_size > 0:
+            self._run_stage("fitness", self._evaluate_cached, genomes)
+        else:
+            self._run_stage("fitness", self._evaluate_all, genomes)
+
+        # Scored genomes do not need their parent anymore (no chain across generations)
+        if self.track_changes:
+            for genome in genomes:
+                genome.set_origin(None, None)
+
+    def _end_step(self, previous_best_score):
+        # After each generation: count it and tell which stop criterion is met (None -> continue)
+        self.generation += 1
+        if self.best_score > previous_best_score:
+            self.last_improvement = self.generation
+
+        if self.generation >= self.max_generations:
+            return REASON_MAX_GENERATIONS
+
+        if self.target_score != None and self.best_score >= self.target_score:
+            return REASON_TARGET_SCORE
+
+        if self.stagnation_window > 0 and self.generation - self.last_improvement >= self.stagnation_window:
+            return REASON_STAGNATION
+
+        if self.time_budget > 0 and time.perf_counter() - self.run_start >= self.time_budget:
+            return REASON_TIME_BUDGET
+
+        if self.evaluation_budget > 0 and self.fitness_calls >= self.evaluation_budget:
+            return REASON_EVALUATION_BUDGET
+
+        return None
+
+    def _run_stage(self, stage, function, *args):
+        if not self.profiling:
+            return function(*args)
+
+        start = time.perf_counter()
+        result = function(*args)
+        self.stage_times[stage] += time.perf_counter() - start
+        return result
+
+    def _get_stage(self, stage, function):
+        # Stage function of this run, timed only when profiling (no extra call in the hot loop otherwise)
+        if not self.profiling:
+            return function
+
+        def timed(*args):
+            return self._run_stage(stage, function, *args)
+        return timed
+
+    def _start_run(self):
+        self.run_start = time.perf_counter()
+        self.generation = 0
+        self.last_improvement = 0
+        self.stop_reason = REASON_MAX_GENERATIONS if self.max_generations < 1 else None
+        self.generation_stats = []
+        self.fitness_calls = 0
+        if self.profiling and self.trace_path != None:
+            self.trace_file = open(self.trace_path, "w")
+
+    def _end_run(self):
+        if self.trace_file != None:
+            self.trace_file.close()
+            self.trace_file = None
+
+    def _start_generation(self):
+        if self.profiling:
+            self.stage_times = {"selection": 0.0, "crossover": 0.0, "mutation": 0.0, "fitness": 0.0}
+            self.fitness_calls_start = self.fitness_calls
+            self.cache_hits_start = self.cache_hits
+            self.generation_start = time.perf_counter()
+
+    def _end_generation(self, generation, scores):
+        if not self.profiling:
+            return
+
+        elapsed = time.perf_counter() - self.generation_start
+        previous = self.generation_stats[-1] if len(self.generation_stats) > 0 else None
+
+        # Convergence: generations without a better score, and mean relative to best (1 -> uniform population)
+        best = float(max(scores))
+        mean = float(sum(scores) / len(scores))
+        best_so_far = max(best, previous["best_so_far"]) if previous != None else best
+        stagnation = 0
+        if previous != None and best_so_far <= previous["best_so_far"]:
+            stagnation = previous["stagnation"] + 1
+
+        stats = {
+            "generation": generation,
+            "time": elapsed,
+            "stages": dict(self.stage_times),
+            "fitness_calls": self.fitness_calls - self.fitness_calls_start,
+            "cache_hits": self.cache_hits - self.cache_hits_start,
+            "best": best,
+            "mean": mean,
+            "best_so_far": best_so_far,
+            "stagnation": stagnation,
+            "convergence": mean / best if best != 0 else 1.0,
+        }
+        self.generation_stats.append(stats)
+
+        if self.trace_file != None:
+            self.trace_file.write(json.dumps(stats) + "\n")
+
+        for callback in self.callbacks:
+            callback(stats)
+
+    def _run_generations(self):
+        # Init population
+        self._start_generation()
+        self.population = []
+        self.total_score = 0
+
+        for i in range(self.population_size):
+            genome = Genome(self.genome_length, self.gene_pool, self.random, self.packed)
+            genome.set_random_genome()          
+            self.population.append(genome)
+
+        self._evaluate(self.population)
+
+        for genome in self.population:
+            self.total_score += genome.get_score()
+
+        # Second buffer, the generations are then written in place alternately in both buffers
+        self.spare = []
+        for i in range(self.population_size):
+            genome = Genome(self.genome_length, self.gene_pool, self.random, self.packed)
+            genome.set_empty_genome()
+            self.spare.append(genome)
+
+        self._end_generation(0, [genome.get_score() for genome in self.population])
+
+        # Stages run for each child
+        selection = self._get_stage("selection", self._selection)
+        crossover = self._get_stage("crossover", self._crossover)
+        mutation = self._get_stage("mutation", self._mutation)
+
+        # Create generations
+        while self.stop_reason == None:
+            self._start_generation()
+            previous_best_score = self.best_score
+            
+            # Copy the elite (already scored), the other individuals are children
+            new_population = self.spare
+            new_total_score = 0
+            elite = heapq.nlargest(self.elite_size, self.population, key=Genome.get_score)
+            for genome, elite_genome in zip(new_population, elite):
+                genome.copy_from(elite_genome)
+
+            children = new_population[self.elite_size:]
+            self._run_stage("selection", self._prepare_selection)
+            
+            for child in children:
+                # The buffer held a genome two generations ago, its data must not be reused
+                child.set_data(None)
+                self.child = child
+                selection()
+                crossover()
+                mutation()
+
+            # Score children (selection only depends on the previous population)
+            self._evaluate(children)
+
+            best_genome = None
+            for genome in new_population:
+                score = genome.get_score()
+                new_total_score += score
+
+                # Keep best genome
+                if score >= self.best_score:
+                    self.best_score = score
+                    best_genome = genome
+
+            # Copy it, as the buffer is overwritten two generations later
+            if best_genome != None:
+                self.best_genome = best_genome.copy()
+            
+            # Set population (the previous one becomes the spare buffer)
+            self.spare = self.population
+            self.population = new_population
+            self.total_score = new_total_score
+
+            self.stop_reason = self._end_step(previous_best_score)
+            self._end_generation(self.generation, [genome.get_score() for genome in self.population])
+            if self.migration != None and self.stop_reason == None:
+                self.migration(self)
+
     # Public
     def get_best_genome(self):
         return self.best_genome
 
+    def get_cache_hits(self):
+        return self.cache_hits
+
+    def get_cache_misses(self):
+        return self.cache_misses
+
+    def get_fitness_calls(self):
+        return self.fitness_calls
+
+    def get_generation_stats(self):
+        # One dict per generation of the last run (generation 0 is the initial population)
+        return self.generation_stats
+
+    def get_stage_totals(self):
+        # Seconds spent in each stage over the last run
+        totals = {"selection": 0.0, "crossover": 0.0, "mutation": 0.0, "fitness": 0.0, "total": 0.0}
+        for stats in self.generation_stats:
+            for stage, seconds in stats["stages"].items():
+                totals[stage] += seconds
+            totals["total"] += stats["time"]
+        return totals
+
+    def get_stop_reason(self):
+        return self.stop_reason
+
+    def get_generations(self):
+        # Generations created by the last run (initial population excluded)
+        return self.generation
+
+    def get_seed(self):
+        # Entropy of the run (also when no seed was given), enough to reproduce it
+        return self.seed_sequence.entropy
+
+    def get_substream_seed(self, index):
+        # Deterministic seed of an independent substream (e.g. one per worker, island or maze)
+        sequence = np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=(index,))
+        return int(sequence.generate_state(1, np.uint64)[0])
+
+    def get_emigrants(self, count):
+        # Best individuals as (genes, score), copied so they can be sent to another population
+        best = heapq.nlargest(count, self.population, key=Genome.get_score)
+        return [(genome.get_genome().copy(), genome.get_score()) for genome in best]
+
+    def add_immigrants(self, immigrants):
+        # Replace the worst individuals, scores are kept (the fitness is not called again)
+        immigrants = immigrants[:self.population_size]
+        worst = heapq.nsmallest(len(immigrants), self.population, key=Genome.get_score)
+
+        for genome, (genes, score) in zip(worst, immigrants):
+            self.total_score += score - genome.get_score()
+            genome.set_genome(genes)
+            genome.set_score(score)
+            genome.set_data(None)
+            genome.set_origin(None, None)
+
+    def set_migration(self, migration):
+        # migration(ga) after each generation, while the run continues
+        self.migration = migration
+
     def set_crossover_points(self, crossover_points):
         crossover_points.sort()
 
@@ -156,43 +678,571 @@ class GeneticAlgorithm:
         
         self.mutation_probability = mutation_probability
 
+    def set_selection(self, selection, tournament_size=2):
+        if selection not in SELECTIONS:
+            raise Exception("Selection " + str(selection) + " does not exist")
+
+        if tournament_size < 1:
+            raise Exception("Tournament size cannot be smaller than 1")
+
+        self.selection = selection
+        self.tournament_size = tournament_size
+
+    def set_stop_criteria(self, stagnation_window=0, target_score=None, time_budget=0, evaluation_budget=0):
+        # A run stops at max_generations or at the first criterion met (checked after each generation)
+        if stagnation_window < 0:
+            raise Exception("Stagnation window cannot be negative")
+
+        if time_budget < 0:
+            raise Exception("Time budget cannot be negative")
+
+        if evaluation_budget < 0:
+            raise Exception("Evaluation budget cannot be negative")
+
+        self.stagnation_window = stagnation_window
+        self.target_score = target_score
+        self.time_budget = time_budget
+        self.evaluation_budget = evaluation_budget
+
+    def set_elitism(self, elite_size):
+        # The elite_size best individuals are copied to the next generation (not evaluated again)
+        if elite_size < 0:
+            raise Exception("Elite size cannot be negative")
+
+        if elite_size >= self.population_size:
+            raise Exception("Elite size must be smaller than the population size")
+
+        self.elite_size = elite_size
+
+    def set_seed(self, seed):
+        # None -> a new random seed (still readable with get_seed)
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self._reset_random()
+
+    def set_fitness_batch(self, fitness_batch):
+        # fitness_batch(genomes) -> scores, one score per genome in the same order
+        # (the vectorized engine gives a matrix of gene values instead, one row per genome)
+        self.fitness_batch = fitness_batch
+        self.close()
+
+    def set_fitness_cache(self, cache_size):
+        # Scores are kept across runs, the fitness must only depend on the genes
+        if cache_size < 0:
+            raise Exception("Fitness cache size cannot be negative")
+
+        self.cache_size = cache_size
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def clear_fitness_cache(self):
+        self.cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def set_change_tracking(self, track_changes):
+        # Children then give their first parent and changed genes to the fitness function
+        # (with get_parent and get_changes), so it can reuse the work done for the parent
+        self.track_changes = track_changes
+
+    def set_packed_genomes(self, packed):
+        # Store each genome as a BitGrid, for gene pools of 0 and 1 (e.g. tiles)
+        if packed and sorted(self.gene_pool) != [0, 1]:
+            raise Exception("Packed genomes need a gene pool of 0 and 1")
+
+        self.packed = packed
+
+    def set_profiling(self, profiling, trace_path=None):
+        # Statistics of each generation (stage times, fitness calls, best/mean scores, convergence),
+        # optionally written to a JSON-lines file
+        self.profiling = profiling
+        self.trace_path = trace_path
+
+    def add_generation_callback(self, callback):
+        # callback(stats) after each generation (enables profiling)
+        self.callbacks.append(callback)
+        self.profiling = True
+
+    def set_workers(self, workers, initializer=None, initargs=()):
+        # Fitness functions and initializer must be picklable (defined at module level)
+        if workers < 0:
+            raise Exception("Number of workers cannot be negative")
+
+        self.workers = workers
+        self.worker_initializer = initializer
+        self.worker_initargs = initargs
+        self.close()
+
+    def close(self):
+        # Stop the worker processes (a new pool is created if needed)
+        if self.pool != None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
     def run(self):
         self.best_score = 0
         self.best_genome = None
+        self._reset_random()
+        self._start_run()
+
+        try:
+            self._run_generations()
+        finally:
+            self._end_run()
 
+
+class VectorizedGeneticAlgorithm(GeneticAlgorithm):
+    def __init__(self, genome_length, gene_pool, population_size, max_generations, fitness, seed=None):
+        super().__init__(genome_length, gene_pool, population_size, max_generations, fitness, seed)
+
+        if len(gene_pool) < 1 or len(gene_pool) > 256:
+            raise Exception("Gene pool must have between 1 and 256 genes")
+
+        for gene in gene_pool:
+            if gene < 0 or gene > 255:
+                raise Exception("All genes must be between 0 and 255")
+
+        self.gene_values = np.array(gene_pool, dtype=np.uint8) # Gene value for each gene pool index
+        self.gene_indices = np.zeros(256, dtype=np.uint8)       # Gene pool index for each gene value
+        self.gene_indices[self.gene_values] = np.arange(len(gene_pool))
+
+        self.matrix = None          # Population as a (population_size, genome_length) matrix of gene pool indices
+        self.scores = None          # Score of each individual of the population
+        self.parent_indices = None  # Rows of the two parents of each child (population_size, 2)
+        self.children = None        # Children as a (population_size, genome_length) matrix of gene pool indices
+        self.second_parents = None  # Preallocated matrix of the second parent of each child
+        self.crossover_mask = None  # True where a gene is copied from the second parent
+        self.genomes = []           # Scored genomes of the population (parents of the next children, None with the batch fitness)
+
+    # Private
+    def _selection(self):
+        if self.selection == SELECTION_TOURNAMENT:
+            # Best of tournament_size random rows for each parent (first one on ties)
+            contestants = self.rng.integers(0, self.population_size, (self.population_size, 2, self.tournament_size))
+            winners = np.argmax(self.scores[contestants], axis=2)
+            self.parent_indices = np.take_along_axis(contestants, winners[:, :, None], axis=2)[:, :, 0]
+            return
+
+        # When total score is 0, choose two different parents randomly for each child
+        if self.total_score == 0:
+            parent_1 = self.rng.integers(0, self.population_size, self.population_size)
+            parent_2 = parent_1
+            if self.population_size > 1:
+                offset = self.rng.integers(1, self.population_size, self.population_size)
+                parent_2 = (parent_1 + offset) % self.population_size
+            self.parent_indices = np.stack([parent_1, parent_2], axis=1)
+            return
+
+        # Roulette wheel on the cumulative scores (second parent can be the same as the first one)
+        cumulative = np.cumsum(self.scores)
+        if self.selection == SELECTION_SUS:
+            # Evenly spaced pointers, then shuffled into pairs
+            count = 2 * self.population_size
+            spacing = cumulative[-1] / count
+            rnd = self.rng.uniform(0, spacing) + np.arange(count) * spacing
+            rnd = self.rng.permutation(rnd).reshape(self.population_size, 2)
+        else:
+            rnd = self.rng.uniform(0, cumulative[-1], (self.population_size, 2))
+        self.parent_indices = np.searchsorted(cumulative, rnd, side="left")
+        np.minimum(self.parent_indices, self.population_size - 1, out=self.parent_indices)
+
+    def _crossover(self):
+        # Written in the preallocated children matrix
+        np.take(self.matrix, self.parent_indices[:, 0], axis=0, out=self.children)
+        np.take(self.matrix, self.parent_indices[:, 1], axis=0, out=self.second_parents)
+        np.copyto(self.children, self.second_parents, where=self.crossover_mask)
+
+    def _mutation(self):
+        gene_number = len(self.gene_pool)
+        if gene_number < 2 or self.mutation_probability == 0:
+            return
+
+        # Draw the number of mutated genes, then their positions in the flattened matrix
+        total = self.children.size
+        count = self.rng.binomial(total, self.mutation_probability)
+        positions = np.unique(self.rng.integers(0, total, count))
+
+        # Replace each mutated gene by another gene of the pool
+        flat = self.children.reshape(-1)
+        offset = self.rng.integers(1, gene_number, len(positions))
+        flat[positions] = (flat[positions].astype(np.int64) + offset) % gene_number
+
+    def _reset_random(self):
+        super()._reset_random()
+        self.rng = np.random.default_rng(self.seed_sequence.entropy) # Random generator for batched draws
+
+    def _get_crossover_mask(self):
+        # Number of crossover points at or before each gene, odd means second parent
+        points = np.array(self.crossover_points)
+        genes = np.arange(self.genome_length)
+        return np.searchsorted(points, genes, side="right") % 2 == 1
+
+    def _use_genomes(self):
+        # Genome objects are only needed by the workers, the serial fitness and the change tracking
+        return self.fitness_batch == None or self.workers > 1 or self.track_changes
+
+    def _get_genes(self, row):
+        # Genes of one matrix row, stored like the genes of a Genome
+        values = self.gene_values[row]
+        if self.packed:
+            return BitGrid(self.genome_length, np.packbits(values).tobytes())
+        return values.tolist()
+
+    def _get_row_key(self, values):
+        # Same key as the genome of this row (packed genomes hash their bits)
+        data = np.packbits(values).tobytes() if self.packed else values.tobytes()
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def _evaluate_values(self, values):
+        # Gene values (one row per genome) are given to the batch fitness as they are
+        if len(values) == 0:
+            return np.zeros(0)
+
+        self.fitness_calls += len(values)
+        return np.maximum(0, np.asarray(self.fitness_batch(values), dtype=float))
+
+    def _evaluate_values_cached(self, values):
+        # Read known scores, and evaluate each unknown row only once
+        scores = np.empty(len(values))
+        pending = OrderedDict()
+        for i, row in enumerate(values):
+            key = self._get_row_key(row)
+
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                scores[i] = self.cache[key]
+                self.cache_hits += 1
+            elif key in pending:
+                pending[key].append(i)
+                self.cache_hits += 1
+            else:
+                pending[key] = [i]
+                self.cache_misses += 1
+
+        evaluated = self._evaluate_values(values[[same[0] for same in pending.values()]])
+
+        for (key, same), score in zip(pending.items(), evaluated):
+            scores[same] = score
+
+            # Keep the most recent scores only
+            self.cache[key] = score
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        return scores
+
+    def _evaluate_matrix(self, matrix, parent_indices=None):
+        values = self.gene_values[matrix]
+
+        # Batch fitness: no genome at all (None instead of the genomes)
+        if not self._use_genomes():
+            if self.cache_size > 0:
+                scores = self._run_stage("fitness", self._evaluate_values_cached, values)
+            else:
+                scores = self._run_stage("fitness", self._evaluate_values, values)
+            return None, scores
+
+        genomes = []
+        if self.packed:
+            for row in np.packbits(values, axis=1):
+                genome = Genome(self.genome_length, self.gene_pool, self.random, True)
+                genome.set_genome(BitGrid(self.genome_length, row.tobytes()))
+                genomes.append(genome)
+        else:
+            for row in values.tolist():
+                genome = Genome(self.genome_length, self.gene_pool, self.random)
+                genome.set_genome(row)
+                genomes.append(genome)
+
+        # Genes differing from the first parent, as sorted indices per child
+        if self.track_changes and parent_indices is not None:
+            rows, cols = np.nonzero(matrix != self.matrix[parent_indices])
+            bounds = np.searchsorted(rows, np.arange(len(matrix) + 1))
+            for i, genome in enumerate(genomes):
+                parent = self.genomes[parent_indices[i]]
+                genome.set_origin(parent, cols[bounds[i]:bounds[i + 1]].tolist())
+
+        self._evaluate(genomes)
+        scores = np.array([genome.get_score() for genome in genomes])
+
+        return genomes, scores
+
+    def _run_generations(self):
         # Init population
-        self.population = []
-        self.total_score = 0
+        self._start_generation()
+        shape = (self.population_size, self.genome_length)
+        self.matrix = self.rng.integers(0, len(self.gene_pool), shape, dtype=np.uint8)
+        self.genomes, self.scores = self._evaluate_matrix(self.matrix)
+        self.total_score = self.scores.sum()
+        self._end_generation(0, self.scores)
 
-        for i in range(self.population_size):
-            genome = Genome(self.genome_length, self.gene_pool)
-            genome.set_random_genome()          
-            score = self.fitness(genome)
-            genome.set_score(score)
-            self.population.append(genome)
-            self.total_score += score
+        # Second buffers, the children matrix is then swapped with the population one
+        self.children = np.empty_like(self.matrix)
+        self.second_parents = np.empty_like(self.matrix)
 
         # Create generations
-        for g in range(self.max_generations):
-            
+        while self.stop_reason == None:
+            self._start_generation()
+            previous_best_score = self.best_score
+
             # Create children
-            new_population = []
-            new_total_score = 0
-            
-            for i in range(self.population_size):        
-                self._selection()
-                self._crossover()
-                self._mutation()
-                score = self.fitness(self.child)
-                self.child.set_score(score)
-                new_population.append(self.child)
-                new_total_score += score
+            self._run_stage("selection", self._selection)
+            self._run_stage("crossover", self._crossover)
+            self._run_stage("mutation", self._mutation)
 
-                # Keep best genome
-                if score >= self.best_score:
-                    self.best_score = score
-                    self.best_genome = self.child
-            
-            # Set population
-            self.population = new_population
-            self.total_score = new_total_score
\ No newline at end of file
+            # Replace the first children by the elite (already scored)
+            count = self.elite_size
+            elite = np.argsort(-self.scores, kind="stable")[:count]
+            self.children[:count] = self.matrix[elite]
+            genomes, scores = self._evaluate_matrix(self.children[count:], self.parent_indices[count:, 0])
+            if count > 0:
+                if genomes != None:
+                    genomes = [self.genomes[i] for i in elite] + genomes
+                scores = np.concatenate([self.scores[elite], scores])
+
+            # Keep best genome (the last one on ties, like the serial engine)
+            best_index = self.population_size - 1 - int(np.argmax(scores[::-1]))
+            if scores[best_index] >= self.best_score:
+                self.best_score = scores[best_index]
+                if genomes != None:
+                    self.best_genome = genomes[best_index]
+                else:
+                    self.best_genome = Genome(self.genome_length, self.gene_pool, self.random, self.packed)
+                    self.best_genome.set_genome(self._get_genes(self.children[best_index]))
+                    self.best_genome.set_score(scores[best_index])
+
+            # Set population (the previous matrix receives the next children)
+            self.matrix, self.children = self.children, self.matrix
+            self.genomes = genomes
+            self.scores = scores
+            self.total_score = scores.sum()
+
+            self.stop_reason = self._end_step(previous_best_score)
+            self._end_generation(self.generation, self.scores)
+            if self.migration != None and self.stop_reason == None:
+                self.migration(self)
+
+    # Public
+    def get_emigrants(self, count):
+        best = np.argsort(-self.scores, kind="stable")[:count]
+        return [(self._get_genes(self.matrix[i]), float(self.scores[i])) for i in best]
+
+    def add_immigrants(self, immigrants):
+        immigrants = immigrants[:self.population_size]
+        worst = np.argsort(self.scores, kind="stable")[:len(immigrants)]
+
+        for row, (genes, score) in zip(worst, immigrants):
+            values = genes.unpack() if isinstance(genes, BitGrid) else genes
+            self.matrix[row] = self.gene_indices[np.frombuffer(bytes(values), dtype=np.uint8)]
+            self.scores[row] = score
+
+            if self.genomes != None:
+                genome = Genome(self.genome_length, self.gene_pool, self.random, self.packed)
+                genome.set_genome(genes)
+                genome.set_score(score)
+                self.genomes[row] = genome
+
+        self.total_score = self.scores.sum()
+
+    def run(self):
+        self.crossover_mask = self._get_crossover_mask()
+        super().run()
+
+
+class _Migration:
+    def __init__(self, index, inboxes, sources, targets, interval, size):
+        self.index = index          # Island of this process
+        self.inboxes = inboxes      # Queue of each island, receiving (source, generation, migrants)
+        self.sources = sources      # Islands sending migrants to this one
+        self.targets = targets      # Islands receiving the migrants of this one
+        self.interval = interval    # Generations between two migrations
+        self.size = size            # Number of migrants sent to each target
+        self.active = set(sources)  # Sources that did not stop yet
+        self.received = {}          # Migrants by (generation, source), received ahead of time
+
+    def __call__(self, ga):
+        generation = ga.get_generations()
+        if generation % self.interval != 0:
+            return
+
+        emigrants = ga.get_emigrants(self.size)
+        for target in self.targets:
+            self.inboxes[target].put((self.index, generation, emigrants))
+
+        # Wait for every running source (same generation, so seeded runs are reproducible)
+        while any(source in self.active and (generation, source) not in self.received for source in self.sources):
+            source, source_generation, migrants = self.inboxes[self.index].get()
+            if migrants == None:
+                self.active.discard(source)
+            else:
+                self.received[(source_generation, source)] = migrants
+
+        immigrants = []
+        for source in self.sources:
+            immigrants.extend(self.received.pop((generation, source), []))
+        ga.add_immigrants(immigrants)
+
+    def finish(self):
+        # Sources waiting for this island do not wait anymore
+        for target in self.targets:
+            self.inboxes[target].put((self.index, None, None))
+
+
+def _run_island(ga, index, seed, migration, results):
+    # Configure the island like the fitness workers (e.g. parameters read by the fitness function)
+    if ga.worker_initializer != None:
+        ga.worker_initializer(*ga.worker_initargs)
+
+    ga.set_seed(seed)
+    ga.set_migration(migration)
+    if ga.trace_path != None:
+        ga.trace_path += "." + str(index)
+
+    try:
+        ga.run()
+    finally:
+        migration.finish()
+        ga.close()
+
+    best = ga.get_best_genome()
+    results.put({
+        "index": index,
+        "genes": best.get_genome() if best != None else None,
+        "score": best.get_score() if best != None else 0,
+        "stop_reason": ga.get_stop_reason(),
+        "generations": ga.get_generations(),
+        "fitness_calls": ga.get_fitness_calls(),
+        "cache_hits": ga.get_cache_hits(),
+        "cache_misses": ga.get_cache_misses(),
+        "generation_stats": ga.get_generation_stats(),
+    })
+
+
+class IslandGeneticAlgorithm:
+    def __init__(self, ga, islands, migration_interval=10, migration_size=1, topology=TOPOLOGY_RING):
+        if islands < 1:
+            raise Exception("Number of islands cannot be smaller than 1")
+
+        if migration_interval < 1:
+            raise Exception("Migration interval cannot be smaller than 1")
+
+        if migration_size < 0 or migration_size > ga.population_size:
+            raise Exception("Migration size must be between 0 and the population size")
+
+        if topology not in TOPOLOGIES:
+            raise Exception("Topology " + str(topology) + " does not exist")
+
+        self.ga = ga                # Configured algorithm copied to each island (its seed gives the island seeds)
+        self.islands = islands      # Number of populations, each one in its own process
+        self.migration_interval = migration_interval # Generations between two migrations
+        self.migration_size = migration_size         # Best individuals sent to each target island
+        self.topology = topology    # Islands receiving the migrants of each island
+
+        self.results = []           # Result of each island of the last run
+        self.best_genome = None     # Best genome of all islands
+
+    # Private
+    def _get_targets(self, index):
+        if self.topology == TOPOLOGY_RING:
+            return [(index + 1) % self.islands] if self.islands > 1 else []
+        return [i for i in range(self.islands) if i != index]
+
+    def _get_sources(self, index):
+        if self.topology == TOPOLOGY_RING:
+            return [(index - 1) % self.islands] if self.islands > 1 else []
+        return [i for i in range(self.islands) if i != index]
+
+    def _get_best_result(self):
+        # Best score, first island on ties
+        return max(self.results, key=lambda result: result["score"])
+
+    # Public
+    def get_best_genome(self):
+        return self.best_genome
+
+    def get_island_results(self):
+        # One dict per island (best score, stop reason, generations, fitness calls...)
+        return self.results
+
+    def get_seed(self):
+        return self.ga.get_seed()
+
+    def set_seed(self, seed):
+        self.ga.set_seed(seed)
+
+    def set_profiling(self, profiling, trace_path=None):
+        # Each island profiles its generations (trace file suffixed with the island index)
+        self.ga.set_profiling(profiling, trace_path)
+
+    def get_stop_reason(self):
+        # Reason of the island of the best genome
+        return self._get_best_result()["stop_reason"]
+
+    def get_generations(self):
+        return max(result["generations"] for result in self.results)
+
+    def get_fitness_calls(self):
+        return sum(result["fitness_calls"] for result in self.results)
+
+    def get_cache_hits(self):
+        return sum(result["cache_hits"] for result in self.results)
+
+    def get_cache_misses(self):
+        return sum(result["cache_misses"] for result in self.results)
+
+    def get_generation_stats(self):
+        # Statistics of the island of the best genome
+        return self._get_best_result()["generation_stats"]
+
+    def get_stage_totals(self):
+        # Seconds spent in each stage, summed over the islands
+        totals = {"selection": 0.0, "crossover": 0.0, "mutation": 0.0, "fitness": 0.0, "total": 0.0}
+        for result in self.results:
+            for stats in result["generation_stats"]:
+                for stage, seconds in stats["stages"].items():
+                    totals[stage] += seconds
+                totals["total"] += stats["time"]
+        return totals
+
+    def close(self):
+        self.ga.close()
+
+    def run(self):
+        self.ga.close()
+        inboxes = [multiprocessing.Queue() for i in range(self.islands)]
+        results = multiprocessing.Queue()
+
+        processes = []
+        for index in range(self.islands):
+            migration = _Migration(
+                index, inboxes, self._get_sources(index), self._get_targets(index),
+                self.migration_interval, self.migration_size
+            )
+            seed = self.ga.get_substream_seed(index)
+            process = multiprocessing.Process(target=_run_island, args=(self.ga, index, seed, migration, results))
+            process.start()
+            processes.append(process)
+
+        # Read the results before joining (a process ends once its queued data is read)
+        self.results = []
+        while len(self.results) < self.islands:
+            try:
+                self.results.append(results.get(timeout=1.0))
+            except queue.Empty:
+                failed = [p for p in processes if p.exitcode != None and p.exitcode != 0]
+                if len(failed) > 0:
+                    for process in processes:
+                        process.terminate()
+                    raise Exception("Island process exited with code " + str(failed[0].exitcode))
+
+        for process in processes:
+            process.join()
+
+        self.results.sort(key=lambda result: result["index"])
+        best = self._get_best_result()
+
+        self.best_genome = None
+        if best["genes"] != None:
+            self.best_genome = Genome(self.ga.genome_length, self.ga.gene_pool, None, self.ga.packed)
+            self.best_genome.set_genome(best["genes"])
+            self.best_genome.set_score(best["score"])
@@ -0,0 +1,282 @@
+import MazeGenerator as mg
+from MazeFile import MazeWriter
+from MazeRenderer import MazeRendered, MinecraftConnector
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+
+TILE_CHARS = bytes.maketrans(b"\x00\x01", b"01") # Tiles written as a string of 0 (empty) and 1 (wall)
+TILE_VALUES = bytes.maketrans(b"01", b"\x00\x01") # String of tiles back to one byte per tile
+
+PIPELINE_POLL = 0.1 # Seconds between two checks of the render stage while the queue is full
+
+_generators = {} # Genetic algorithm of each maze size, kept (worker pool, fitness cache) for the next mazes
+
+
+def set_maze_size(height, width):
+    mg.set_parameters({
+        "MAZE_HEIGHT": height,
+        "MAZE_WIDTH": width,
+        "MAZE_END": (height - 1, width - 2),
+    })
+
+
+def get_generator(height, width):
+    if (height, width) not in _generators:
+        mg.check_parameters()
+        _generators[(height, width)] = mg.create_genetic_algorithm()
+    return _generators[(height, width)]
+
+
+def close_generators():
+    for ga in _generators.values():
+        ga.close()
+    _generators.clear()
+
+
+def generate_maze(task):
+    index, height, width, seed = task
+    start = time.perf_counter()
+
+    set_maze_size(height, width)
+    ga = get_generator(height, width)
+    ga.set_seed(seed)
+    ga.run()
+
+    best_genome = ga.get_best_genome()
+    maze, locations = mg.solve_maze(best_genome.get_genome())
+
+    return {
+        "index": index,
+        "seed": seed,
+        "height": height,
+        "width": width,
+        "score": float(best_genome.get_score()),
+        "generations": ga.get_generations(),
+        "stop_reason": ga.get_stop_reason(),
+        "time": time.perf_counter() - start,
+        "start": list(mg.MAZE_START),
+        "end": list(mg.MAZE_END),
+        "maze": bytes(list(maze)).translate(TILE_CHARS).decode(),
+        "path": locations,
+    }
+
+
+def init_job(env_file):
+    # Each job process reads the settings once, then keeps its generators for all its mazes
+    mg.load_parameters(env_file)
+
+
+def get_tasks(count, sizes, seed):
+    # Sizes are used in turn, seeds follow the base seed
+    tasks = []
+    for i in range(count):
+        size = sizes[i % len(sizes)]
+        tasks.append((i, size, size, seed + i))
+    return tasks
+
+
+def write_result(result, output, output_dir, archive, minecraft=None, schematic_dir=None):
+    if minecraft != None or schematic_dir != None:
+        maze = list(result["maze"].encode().translate(TILE_VALUES))
+        mr = MazeRendered(result["height"], result["width"], maze, result["start"], result["end"], result["path"])
+
+        # Each maze replaces the previous one in place (MINECRAFT_STATE is checked in main)
+        if minecraft != None:
+            mr.render_minecraft(mg.MINECRAFT_FILL, minecraft, mg.MINECRAFT_STATE)
+
+        if schematic_dir != None:
+            mr.render_schematic(os.path.join(schematic_dir, "maze_" + str(result["index"]).zfill(5) + ".schem"))
+
+    if archive != None:
+        maze = result["maze"].encode().translate(TILE_VALUES)
+        archive.write(result["height"], result["width"], maze, result["start"], result["end"], result["path"])
+
+    if output == None and output_dir == None:
+        return
+
+    line = json.dumps(result)
+
+    if output != None:
+        output.write(line + "\n")
+        output.flush()
+
+    if output_dir != None:
+        path = os.path.join(output_dir, "maze_" + str(result["index"]).zfill(5) + ".json")
+        with open(path, "w") as f:
+            f.write(line + "\n")
+
+
+def run_pipeline(results, render, queue_size):
+    # Generation (iterating the results) and rendering (thread) overlap,
+    # generation waits once queue_size results are waiting to be rendered.
+    # Returns the seconds generation waited
+    pending = queue.Queue(queue_size)
+    errors = []
+
+    def render_stage():
+        while True:
+            result = pending.get()
+            if result == None:
+                return
+            try:
+                render(result)
+            except Exception as e:
+                errors.append(e)
+                return
+
+    def put(item):
+        # Wait for a free place, unless the render stage stopped on an error
+        while not errors:
+            try:
+                pending.put(item, timeout=PIPELINE_POLL)
+                return
+            except queue.Full:
+                pass
+
+    thread = threading.Thread(target=render_stage, daemon=True)
+    thread.start()
+    waited = 0.0
+
+    try:
+        for result in results:
+            start = time.perf_counter()
+            put(result)
+            waited += time.perf_counter() - start
+
+            if errors:
+                break
+    finally:
+        # The render stage ends once the waiting results are rendered
+        put(None)
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return waited
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description="Generate many mazes in one invocation")
+    parser.add_argument("--count", type=int, default=10, help="Number of mazes to generate")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None, help="Maze sizes used in turn (default: MAZE_HEIGHT)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the first maze, +1 for each next maze (default: SEED or random)")
+    parser.add_argument("--jobs", type=int, default=1, help="Processes generating mazes in parallel")
+    parser.add_argument("--env", default=".env", help="Settings file")
+    parser.add_argument("--output", default="-", help="JSON-lines file receiving the mazes (-: standard output, empty: none)")
+    parser.add_argument("--output-dir", default=None, help="Directory receiving one JSON file per maze")
+    parser.add_argument("--archive", default=None, help="Binary maze archive receiving all the mazes (see MazeFile)")
+    parser.add_argument("--schematic-dir", default=None, help="Directory receiving one schematic per maze (see SCHEMATIC_FILE)")
+    parser.add_argument("--minecraft", action="store_true", help="Render each maze in Minecraft in place of the previous one (MINECRAFT_* settings, MINECRAFT_STATE is needed for more than one maze)")
+    parser.add_argument("--pipeline", type=int, default=0, help="Mazes waiting to be written/rendered while the next ones are generated (0: in turn)")
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    mg.load_parameters(args.env)
+
+    sizes = args.sizes if args.sizes != None else [mg.MAZE_HEIGHT]
+    seed = args.seed
+    if seed == None:
+        seed = mg.SEED if mg.SEED != None else random.randrange(2 ** 32)
+
+    if args.count < 0:
+        raise Exception("Count cannot be negative")
+
+    if args.jobs < 1:
+        raise Exception("Jobs cannot be smaller than 1")
+
+    # Job processes are daemons, they cannot start fitness workers or islands
+    if args.jobs > 1 and (mg.FITNESS_WORKERS > 1 or mg.ISLANDS > 1):
+        raise Exception("Parallel jobs cannot be used with fitness workers or islands")
+
+    # Check every size before generating
+    for size in sizes:
+        set_maze_size(size, size)
+        mg.check_parameters()
+
+    if args.pipeline < 0:
+        raise Exception("Pipeline cannot be negative")
+
+    # Without a render state, each maze would be drawn over the previous one at the player position
+    if args.minecraft and args.count > 1 and mg.MINECRAFT_STATE == None:
+        raise Exception("Rendering several mazes in Minecraft needs MINECRAFT_STATE")
+
+    if args.output_dir != None:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.schematic_dir != None:
+        os.makedirs(args.schematic_dir, exist_ok=True)
+
+    output = None
+    if args.output == "-":
+        output = sys.stdout
+    elif args.output:
+        output = open(args.output, "w")
+
+    archive = None
+    if args.archive != None:
+        archive = MazeWriter(args.archive)
+
+    minecraft = None
+    if args.minecraft:
+        minecraft = MinecraftConnector(mg.MINECRAFT_CHUNK_SIZE, mg.MINECRAFT_WORKERS, mg.MINECRAFT_RETRIES)
+
+    def render(result):
+        write_result(result, output, args.output_dir, archive, minecraft, args.schematic_dir)
+
+    print("## Base seed: " + str(seed), file=sys.stderr)
+    tasks = get_tasks(args.count, sizes, seed)
+    start = time.perf_counter()
+    waited = None
+
+    try:
+        pool = None
+        if args.jobs > 1:
+            pool = multiprocessing.Pool(args.jobs, initializer=init_job, initargs=(args.env,))
+            results = pool.imap(generate_maze, tasks)
+        else:
+            results = map(generate_maze, tasks)
+
+        try:
+            if args.pipeline > 0:
+                # Maze N is written/rendered while maze N+1 is generated
+                waited = run_pipeline(results, render, args.pipeline)
+            else:
+                for result in results:
+                    render(result)
+        finally:
+            if pool != None:
+                pool.terminate()
+                pool.join()
+            else:
+                close_generators()
+    finally:
+        if output != None and output != sys.stdout:
+            output.close()
+        if archive != None:
+            archive.close()
+        if minecraft != None:
+            minecraft.close()
+
+    elapsed = time.perf_counter() - start
+    print("## " + str(args.count) + " mazes in " + "{:.2f}".format(elapsed) + "s", file=sys.stderr)
+    if waited != None:
+        print("## Generation waited " + "{:.2f}".format(waited) + "s for the render stage", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        print("## Error: " + str(e), file=sys.stderr)
+        sys.exit(1)
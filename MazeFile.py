@@ -0,0 +1,249 @@
+from BitGrid import *
+import mmap
+import struct
+import numpy as np
+
+
+# Archive layout (little-endian):
+# - file header: magic, version
+# - records: record header, tiles (one bit per tile, first tile in the high bit), path (varints)
+# - footer: offset of each record, number of records, footer magic
+FILE_MAGIC          = b"MAZE"
+FOOTER_MAGIC        = b"MZIX"
+FILE_VERSION        = 1
+
+FILE_HEADER         = struct.Struct("<4sHH")        # Magic, version, reserved
+RECORD_HEADER       = struct.Struct("<8I")          # Height, width, start (row, col), end (row, col), path locations, path bytes
+FOOTER              = struct.Struct("<Q4s")         # Number of records, footer magic
+OFFSET              = struct.Struct("<Q")           # Offset of a record
+
+
+def encode_varint(value, result):
+    # Unsigned LEB128, 7 bits per byte (low bits first)
+    while value >= 0x80:
+        result.append((value & 0x7F) | 0x80)
+        value >>= 7
+    result.append(value)
+
+
+def decode_varint(data, position):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def encode_path(path_locations, width):
+    # First cell, then the difference with the previous cell (zigzag, so small moves are one byte)
+    result = bytearray()
+    previous = 0
+    for row, col in path_locations:
+        cell = row * width + col
+        delta = cell - previous
+        encode_varint((delta << 1) ^ (delta >> 63), result)
+        previous = cell
+    return bytes(result)
+
+
+def decode_path(data, position, count, width):
+    result = []
+    cell = 0
+    for i in range(count):
+        value, position = decode_varint(data, position)
+        cell += (value >> 1) ^ -(value & 1)
+        result.append(list(divmod(cell, width)))
+    return result
+
+
+def pack_tiles(maze):
+    if isinstance(maze, BitGrid):
+        return bytes(maze)
+    return np.packbits(np.frombuffer(bytes(maze), dtype=np.uint8)).tobytes()
+
+
+class MazeRecord:
+    def __init__(self, height, width, tiles, start, end, path_locations):
+        self.height = height    # Height of the maze
+        self.width = width      # Width of the maze
+        self.tiles = tiles      # Tiles as a BitGrid, 0 -> empty tile, 1 -> wall tile
+        self.start = start      # Start point as a list [row, col]
+        self.end = end          # End point as a list [row, col]
+        self.path_locations = path_locations # Locations to follow from start to end as a list [[row,col], ...]
+
+    # Public
+    def get_height(self):
+        return self.height
+
+    def get_width(self):
+        return self.width
+
+    def get_tiles(self):
+        return self.tiles
+
+    def get_maze(self):
+        # One int per tile, like the mazes given to MazeRendered
+        return self.tiles.to_list()
+
+    def get_start(self):
+        return self.start
+
+    def get_end(self):
+        return self.end
+
+    def get_path_locations(self):
+        return self.path_locations
+
+
+class MazeWriter:
+    def __init__(self, path):
+        self.file = open(path, "wb")    # Archive being written
+        self.offsets = []               # Offset of each written record
+        self.position = 0               # Current offset in the file
+
+        self._write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Private
+    def _write(self, data):
+        self.file.write(data)
+        self.position += len(data)
+
+    # Public
+    def write(self, height, width, maze, start, end, path_locations):
+        # Records are written as they come, only their offsets are kept for the footer
+        tiles = pack_tiles(maze)
+        if len(tiles) != (height * width + 7) // 8:
+            raise Exception("Maze does not have " + str(height * width) + " tiles")
+
+        path = encode_path(path_locations, width)
+        header = RECORD_HEADER.pack(height, width, start[0], start[1], end[0], end[1], len(path_locations), len(path))
+
+        self.offsets.append(self.position)
+        self._write(header)
+        self._write(tiles)
+        self._write(path)
+
+    def get_count(self):
+        return len(self.offsets)
+
+    def close(self):
+        if self.file == None:
+            return
+
+        for offset in self.offsets:
+            self._write(OFFSET.pack(offset))
+        self._write(FOOTER.pack(len(self.offsets), FOOTER_MAGIC))
+
+        self.file.close()
+        self.file = None
+
+
+class MazeReader:
+    def __init__(self, path):
+        self.file = open(path, "rb")    # Archive being read
+        self.data = None                # Memory map of the archive (pages are loaded when read)
+        self.index_offset = 0           # Offset of the record offsets (footer)
+        self.count = 0                  # Number of records
+        self.offsets = None             # Record offsets, when they had to be found by scanning the records
+
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._read_index()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.read(index)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.read(i)
+
+    # Private
+    def _read_index(self):
+        if len(self.data) < FILE_HEADER.size:
+            raise Exception("Maze file is too small")
+
+        magic, version, reserved = FILE_HEADER.unpack_from(self.data, 0)
+        if magic != FILE_MAGIC:
+            raise Exception("Not a maze file")
+
+        if version != FILE_VERSION:
+            raise Exception("Maze file version " + str(version) + " is not supported")
+
+        if len(self.data) >= FILE_HEADER.size + FOOTER.size:
+            count, magic = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size)
+            if magic == FOOTER_MAGIC:
+                self.count = count
+                self.index_offset = len(self.data) - FOOTER.size - count * OFFSET.size
+                return
+
+        # No footer (e.g. the writer was not closed), find the complete records
+        self._scan()
+
+    def _scan(self):
+        self.offsets = []
+        position = FILE_HEADER.size
+        while position + RECORD_HEADER.size <= len(self.data):
+            header = RECORD_HEADER.unpack_from(self.data, position)
+            size = RECORD_HEADER.size + (header[0] * header[1] + 7) // 8 + header[7]
+            if position + size > len(self.data):
+                break
+            self.offsets.append(position)
+            position += size
+        self.count = len(self.offsets)
+
+    def _get_offset(self, index):
+        if index < -self.count or index >= self.count:
+            raise IndexError("Maze index out of range")
+
+        index %= self.count
+        if self.offsets != None:
+            return self.offsets[index]
+        return OFFSET.unpack_from(self.data, self.index_offset + index * OFFSET.size)[0]
+
+    # Public
+    def read_header(self, index):
+        # (height, width, start, end) without reading the tiles
+        height, width, sr, sc, er, ec, path_count, path_size = RECORD_HEADER.unpack_from(self.data, self._get_offset(index))
+        return height, width, [sr, sc], [er, ec]
+
+    def read(self, index):
+        position = self._get_offset(index)
+        height, width, sr, sc, er, ec, path_count, path_size = RECORD_HEADER.unpack_from(self.data, position)
+        position += RECORD_HEADER.size
+
+        size = (height * width + 7) // 8
+        tiles = BitGrid(height * width, self.data[position:position + size])
+        position += size
+
+        path_locations = decode_path(self.data, position, path_count, width)
+        return MazeRecord(height, width, tiles, [sr, sc], [er, ec], path_locations)
+
+    def close(self):
+        if self.data != None:
+            self.data.close()
+            self.data = None
+        if self.file != None:
+            self.file.close()
+            self.file = None
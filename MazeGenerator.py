@@ -1,8 +1,10 @@
 from Structures import *
+from BitGrid import *
 from GeneticAlgorithm import *
 from SearchAlgorithm import *
 from MazeRenderer import *
 import traceback
+import numpy as np
 from dotenv import load_dotenv
 
 
@@ -26,10 +28,41 @@ GENE_POOL_2             = [
                           ]
 
 POPULATION_SIZE         = 50
+ELITE_SIZE              = 0         # Best individuals copied to the next generation without being evaluated again
+ISLANDS                 = 0         # Number of populations evolving in their own process (0 or 1: single population)
+MIGRATION_INTERVAL      = 10        # Generations between two migrations of the islands
+MIGRATION_SIZE          = 2         # Best individuals sent by an island to each target island
+MIGRATION_TOPOLOGY      = TOPOLOGY_RING # Islands receiving the migrants: ring (next island) or full (all islands)
+FITNESS_WORKERS         = 0         # Number of processes evaluating the fitness (0 or 1: serial)
+FITNESS_CACHE_SIZE      = 0         # Number of scores kept to skip identical genomes (0: no cache)
 MAX_GENERATIONS         = 200
+STOP_STAGNATION         = 0         # Stop after this many generations without a better score (0: never)
+STOP_TARGET_SCORE       = None      # Stop once the best score reaches this value (None: no target)
+STOP_TIME_BUDGET        = 0.0       # Stop once the run took this many seconds (0: no limit)
+STOP_EVALUATION_BUDGET  = 0         # Stop once the fitness was called this many times (0: no limit)
+SEED                    = None      # Seed of the run (None: random, printed so the maze can be regenerated)
+SELECTION               = SELECTION_ROULETTE # Parent selection: roulette, tournament or sus
+TOURNAMENT_SIZE         = 2         # Individuals competing in each tournament (tournament selection)
+VECTORIZED_GA           = False     # Use the NumPy population engine (whole generation as one matrix)
+PACKED_GENOMES          = False     # Store Gene Pool 1 genomes and mazes with one bit per tile
+BATCH_FITNESS           = False     # Score a whole generation in one call (batched decoding and BFS)
+FAST_SEARCH             = False     # Use the flat-grid BFS (cell indices and preallocated arrays)
+STRUCTURE_SEARCH        = False     # Search on the structure graph instead of the tiles (Gene Pool 2)
+INCREMENTAL_FITNESS     = False     # Patch the parent maze and reuse its search when changes cannot affect it
+INCREMENTAL_MAX_CHANGES = 1.0 / 16.0 # Changed genes ratio above which a child is fully evaluated
+PROFILE_GA              = False     # Time the GA stages of each generation and print a summary
+PROFILE_TRACE           = None      # JSON-lines file receiving the statistics of each generation (None: no trace)
 
 REPLACE_UNREACHABLE     = True      # Replace unreachable tiles (empty) with a wall tiles
 RENDER_MINECRAFT        = False
+MINECRAFT_FILL          = False     # Render walls as merged boxes with fill commands instead of single blocks
+MINECRAFT_CHUNK_SIZE    = UPLOAD_CHUNK_SIZE # Blocks (or fill commands) sent in one request
+MINECRAFT_WORKERS       = UPLOAD_WORKERS    # Requests sent to Minecraft at the same time
+MINECRAFT_RETRIES       = UPLOAD_RETRIES    # Attempts after a failed request
+MINECRAFT_STATE         = None      # File keeping the last Minecraft render, the next one only sends the changes (None: full render)
+WEB_EXPORT              = WEB_EXPORT_LIST # Viewer data: list, bits (base64 packed bits) or rle (run lengths)
+MAZE_FILE               = None      # Binary maze file written after the generation (None: no file)
+SCHEMATIC_FILE          = None      # Sponge schematic of the Minecraft blocks written after the generation (None: no file)
 
 REWARD_START            = 10.0      # When start tile is empty
 REWARD_END              = 10.0      # When end tile is empty
@@ -41,9 +74,29 @@ REWARD_WALLS            = 2.5       # Multiplied by number of wall tiles
 REWARD_UNREACH_TILES    = -5.0      # Multiplied by number of unreachable tiles
 REWARD_LOOPS            = -10.0     # Multiplied by number of revisited tiles
 
+_flat_searches = {} # Flat search of each maze configuration (FAST_SEARCH), reused by every search of the process
+
 
 def fitness(genome):
-    maze = genome_to_maze(genome.get_genome())
+    # Scored parent data (only with INCREMENTAL_FITNESS and change tracking in the GA)
+    parent = genome.get_parent()
+    parent_data = parent.get_data() if parent != None else None
+
+    # Too many changes, decoding everything is faster than patching
+    if parent_data != None and len(genome.get_changes()) > INCREMENTAL_MAX_CHANGES * len(genome.get_genome()):
+        parent_data = None
+
+    if parent_data != None:
+        maze = genome_to_maze(genome.get_genome(), parent_data["maze"], genome.get_changes())
+    else:
+        maze = genome_to_maze(genome.get_genome())
+
+    # Keep the maze and search results for the children of this genome
+    data = None
+    if INCREMENTAL_FITNESS:
+        data = {"maze": maze, "search": None, "touched": None}
+        genome.set_data(data)
+
     score = 0
 
     # Reward empty start
@@ -58,37 +111,148 @@ def fitness(genome):
 
     score += REWARD_END
 
-    # Run search algorithm
-    sa = SearchAlgorithm(MAZE_START, MAZE_END, maze, next_locations)
-    sa.run()
+    # Run search algorithm (or reuse the parent one when no changed tile can be reached)
+    search = None
+    if parent_data != None and parent_data["search"] != None:
+        tiles = changes_to_tiles(genome.get_changes())
+        if not parent_data["touched"][tiles].any():
+            search = parent_data["search"]
+            data["touched"] = parent_data["touched"]
+
+    if search == None:
+        sa = create_search_algorithm(maze, genome.get_genome())
+        sa.run()
+        search = (sa.get_expanded(), sa.get_closest_distance(), sa.get_explored(), sa.get_revisited(), sa.get_path() != None)
+        if data != None:
+            data["touched"] = get_touched_tiles(sa)
+
+    if data != None:
+        data["search"] = search
+
+    expanded, distance, explored, revisited, found = search
     
     # Reward close path to end
-    distance = sa.get_closest_distance()
     score += REWARD_CLOSE_PATH / (1.0 + distance)
     
-    path = sa.get_path()
-    if path == None:
+    if not found:
         return score    
 
     # Reward path
     score += REWARD_PATH
 
     # Reward exploration effort
-    score += REWARD_EXPL_EFFORT * sa.get_expanded()
+    score += REWARD_EXPL_EFFORT * expanded
 
     # Reward walls
     score += REWARD_WALLS * maze.count(TILE_WALL)
 
     # Penalize unreachable tiles
-    score += REWARD_UNREACH_TILES * (maze.count(TILE_EMPTY) - sa.get_explored())
+    score += REWARD_UNREACH_TILES * (maze.count(TILE_EMPTY) - explored)
 
     # Penalize loops from main path
-    score += REWARD_LOOPS * sa.get_revisited()
+    score += REWARD_LOOPS * revisited
 
     score = max(0, score)
     return score
 
 
+def fitness_batch(genomes):
+    genomes = genomes_to_array(genomes)
+    mazes = genomes_to_mazes(genomes)
+    scores = np.zeros(len(mazes))
+
+    # Reward empty start
+    start_empty = mazes[:, MAZE_START[0] * MAZE_WIDTH + MAZE_START[1]] == TILE_EMPTY
+    scores[start_empty] += REWARD_START
+
+    # Reward empty end
+    end_empty = start_empty & (mazes[:, MAZE_END[0] * MAZE_WIDTH + MAZE_END[1]] == TILE_EMPTY)
+    scores[end_empty] += REWARD_END
+
+    # Run search algorithm on all mazes with empty start and end
+    searched = np.nonzero(end_empty)[0]
+    sa = BatchSearchAlgorithm(MAZE_START, MAZE_END, mazes[searched], MAZE_HEIGHT, MAZE_WIDTH)
+    sa.run()
+
+    # Reward close path to end
+    distance = sa.get_closest_distance()
+    scores[searched] += REWARD_CLOSE_PATH / (1.0 + distance)
+
+    found = sa.get_found()
+    solved = searched[found]
+    solved_mazes = mazes[solved]
+
+    # Reward path
+    scores[solved] += REWARD_PATH
+
+    # Reward exploration effort
+    scores[solved] += REWARD_EXPL_EFFORT * sa.get_expanded()[found]
+
+    # Reward walls
+    scores[solved] += REWARD_WALLS * np.count_nonzero(solved_mazes == TILE_WALL, axis=1)
+
+    # Penalize unreachable tiles
+    empty = np.count_nonzero(solved_mazes == TILE_EMPTY, axis=1)
+    scores[solved] += REWARD_UNREACH_TILES * (empty - sa.get_explored()[found])
+
+    # Penalize loops from main path
+    scores[solved] += REWARD_LOOPS * sa.get_revisited()[found]
+
+    scores = np.maximum(0, scores)
+    return scores.tolist()
+
+
+def create_search_algorithm(maze, genome):
+    if STRUCTURE_SEARCH:
+        return StructureSearchAlgorithm(MAZE_START, MAZE_END, genome, MAZE_HEIGHT, MAZE_WIDTH)
+    if FAST_SEARCH:
+        # One instance per maze configuration and process, its arrays are reused by each search
+        # (results must be read before the next search)
+        key = (tuple(MAZE_START), tuple(MAZE_END), MAZE_HEIGHT, MAZE_WIDTH)
+        if key not in _flat_searches:
+            _flat_searches[key] = FlatSearchAlgorithm(MAZE_START, MAZE_END, maze, MAZE_HEIGHT, MAZE_WIDTH)
+        sa = _flat_searches[key]
+        sa.set_grid(maze)
+        return sa
+    return SearchAlgorithm(MAZE_START, MAZE_END, maze, next_locations)
+
+
+def get_touched_tiles(sa):
+    # Explored tiles and their neighbours, changing any other tile cannot change the search
+    # (shifts by one wrap around rows, which only adds tiles and stays safe)
+    if isinstance(sa, SearchAlgorithm):
+        cells = [row * MAZE_WIDTH + col for row, col in sa.get_explored_locations()]
+    else:
+        cells = sa.get_explored_cells()
+
+    explored = np.zeros(MAZE_HEIGHT * MAZE_WIDTH, dtype=bool)
+    explored[cells] = True
+
+    touched = explored.copy()
+    touched[MAZE_WIDTH:] |= explored[:-MAZE_WIDTH]
+    touched[:-MAZE_WIDTH] |= explored[MAZE_WIDTH:]
+    touched[1:] |= explored[:-1]
+    touched[:-1] |= explored[1:]
+    return touched
+
+
+def changes_to_tiles(changes):
+    tiles = changes
+
+    if METHOD_TO_USE == USE_GENE_POOL_2:
+        tiles_per_row = MAZE_WIDTH // STRUCT_SIDE
+        tiles = []
+
+        for t_idx in changes:
+            base_r = t_idx // tiles_per_row * STRUCT_SIDE
+            base_c = t_idx % tiles_per_row * STRUCT_SIDE
+            for sr in range(STRUCT_SIDE):
+                base = (base_r + sr) * MAZE_WIDTH + base_c
+                tiles.extend(range(base, base + STRUCT_SIDE))
+
+    return tiles
+
+
 def next_locations(grid, location):
     result = []
     
@@ -119,7 +283,7 @@ def next_locations(grid, location):
     return result
 
 
-def genome_to_maze(genome):
+def genome_to_maze(genome, parent_maze=None, changes=None):
     maze = None
 
     if METHOD_TO_USE == USE_GENE_POOL_1:
@@ -127,25 +291,65 @@ def genome_to_maze(genome):
     
     elif METHOD_TO_USE == USE_GENE_POOL_2:
         tiles_per_row = MAZE_WIDTH // STRUCT_SIDE
-        maze = [None] * (MAZE_HEIGHT * MAZE_WIDTH)
 
-        for t_idx, struct_id in enumerate(genome):
-            struct = STRUCT[struct_id]
-            tile_row = t_idx // tiles_per_row
-            tile_col = t_idx %  tiles_per_row
-            base_r   = tile_row * STRUCT_SIDE
-            base_c   = tile_col * STRUCT_SIDE
+        if parent_maze == None:
+            # Decode all structures with one gather (maze as a bytearray, one byte per tile)
+            rows = MAZE_HEIGHT // STRUCT_SIDE
+            tiles = STRUCT_ATLAS[np.asarray(genome, dtype=np.uint8).reshape(rows, tiles_per_row)]
+            maze = bytearray(tiles.transpose(0, 2, 1, 3).tobytes())
 
-            for sr in range(STRUCT_SIDE):
-                for sc in range(STRUCT_SIDE):
-                    val = struct[sr * STRUCT_SIDE + sc]
-                    gr  = base_r + sr
-                    gc  = base_c + sc
-                    maze[gr * MAZE_WIDTH + gc] = val
+        else:
+            # Patch only the changed structures of the parent maze, one structure row at a time
+            maze = parent_maze.copy()
+
+            for t_idx in changes:
+                struct = STRUCT[genome[t_idx]]
+                base_r = t_idx // tiles_per_row * STRUCT_SIDE
+                base_c = t_idx % tiles_per_row * STRUCT_SIDE
+
+                for sr in range(STRUCT_SIDE):
+                    base = (base_r + sr) * MAZE_WIDTH + base_c
+                    maze[base:base + STRUCT_SIDE] = struct[sr * STRUCT_SIDE:(sr + 1) * STRUCT_SIDE]
 
     return maze
 
 
+def genomes_to_array(genomes):
+    # Already a matrix of genes (vectorized engine)
+    if isinstance(genomes, np.ndarray):
+        return genomes
+
+    genes = [genome.get_genome() for genome in genomes]
+
+    # Still one row of genes per genome (no row)
+    if len(genes) == 0:
+        return np.zeros((0, get_genome_properties()[0]), dtype=np.uint8)
+
+    # Packed genomes are unpacked together (one row per genome)
+    if isinstance(genes[0], BitGrid):
+        packed = np.frombuffer(b"".join(bytes(g) for g in genes), dtype=np.uint8)
+        packed = packed.reshape(len(genes), -1)
+        return np.unpackbits(packed, axis=1, count=len(genes[0]))
+
+    return np.array(genes, dtype=np.uint8)
+
+
+def genomes_to_mazes(genomes):
+    mazes = None
+
+    if METHOD_TO_USE == USE_GENE_POOL_1:
+        mazes = genomes
+
+    elif METHOD_TO_USE == USE_GENE_POOL_2:
+        # Gather the tiles of every structure, then put the structure rows side by side
+        rows = MAZE_HEIGHT // STRUCT_SIDE
+        cols = MAZE_WIDTH // STRUCT_SIDE
+        tiles = STRUCT_ATLAS[genomes.reshape(len(genomes), rows, cols)]
+        mazes = tiles.transpose(0, 1, 3, 2, 4).reshape(len(genomes), MAZE_HEIGHT * MAZE_WIDTH)
+
+    return mazes
+
+
 def replace_unreachable(maze, explored):
     for r in range(MAZE_HEIGHT):
         for c in range(MAZE_WIDTH):
@@ -195,9 +399,19 @@ def load_parameters(env_file):
         except ValueError:
             return default
 
+    def get_str(key, default: str):
+        v = get_raw(key)
+        return v if v else default
+
     global METHOD_TO_USE, MAZE_HEIGHT, MAZE_WIDTH
-    global POPULATION_SIZE, MAX_GENERATIONS
-    global REPLACE_UNREACHABLE, RENDER_MINECRAFT
+    global POPULATION_SIZE, ELITE_SIZE, FITNESS_WORKERS, FITNESS_CACHE_SIZE, MAX_GENERATIONS
+    global ISLANDS, MIGRATION_INTERVAL, MIGRATION_SIZE, MIGRATION_TOPOLOGY
+    global STOP_STAGNATION, STOP_TARGET_SCORE, STOP_TIME_BUDGET, STOP_EVALUATION_BUDGET
+    global SEED, SELECTION, TOURNAMENT_SIZE, VECTORIZED_GA, PACKED_GENOMES, BATCH_FITNESS
+    global FAST_SEARCH, STRUCTURE_SEARCH, INCREMENTAL_FITNESS, INCREMENTAL_MAX_CHANGES
+    global PROFILE_GA, PROFILE_TRACE
+    global REPLACE_UNREACHABLE, RENDER_MINECRAFT, MINECRAFT_FILL, WEB_EXPORT, MAZE_FILE, SCHEMATIC_FILE
+    global MINECRAFT_CHUNK_SIZE, MINECRAFT_WORKERS, MINECRAFT_RETRIES, MINECRAFT_STATE
     global REWARD_START, REWARD_END, REWARD_CLOSE_PATH, REWARD_PATH
     global REWARD_EXPL_EFFORT, REWARD_WALLS, REWARD_UNREACH_TILES, REWARD_LOOPS
 
@@ -205,9 +419,40 @@ def load_parameters(env_file):
     MAZE_HEIGHT = get_int("MAZE_HEIGHT", MAZE_HEIGHT)
     MAZE_WIDTH = get_int("MAZE_WIDTH", MAZE_WIDTH)
     POPULATION_SIZE = get_int("POPULATION_SIZE", POPULATION_SIZE)
+    ELITE_SIZE = get_int("ELITE_SIZE", ELITE_SIZE)
+    ISLANDS = get_int("ISLANDS", ISLANDS)
+    MIGRATION_INTERVAL = get_int("MIGRATION_INTERVAL", MIGRATION_INTERVAL)
+    MIGRATION_SIZE = get_int("MIGRATION_SIZE", MIGRATION_SIZE)
+    MIGRATION_TOPOLOGY = get_str("MIGRATION_TOPOLOGY", MIGRATION_TOPOLOGY).lower()
+    FITNESS_WORKERS = get_int("FITNESS_WORKERS", FITNESS_WORKERS)
+    FITNESS_CACHE_SIZE = get_int("FITNESS_CACHE_SIZE", FITNESS_CACHE_SIZE)
     MAX_GENERATIONS = get_int("MAX_GENERATIONS", MAX_GENERATIONS)
+    STOP_STAGNATION = get_int("STOP_STAGNATION", STOP_STAGNATION)
+    STOP_TARGET_SCORE = get_float("STOP_TARGET_SCORE", STOP_TARGET_SCORE)
+    STOP_TIME_BUDGET = get_float("STOP_TIME_BUDGET", STOP_TIME_BUDGET)
+    STOP_EVALUATION_BUDGET = get_int("STOP_EVALUATION_BUDGET", STOP_EVALUATION_BUDGET)
+    SEED = get_int("SEED", SEED)
+    SELECTION = get_str("SELECTION", SELECTION).lower()
+    TOURNAMENT_SIZE = get_int("TOURNAMENT_SIZE", TOURNAMENT_SIZE)
+    VECTORIZED_GA = get_bool("VECTORIZED_GA", VECTORIZED_GA)
+    PACKED_GENOMES = get_bool("PACKED_GENOMES", PACKED_GENOMES)
+    BATCH_FITNESS = get_bool("BATCH_FITNESS", BATCH_FITNESS)
+    FAST_SEARCH = get_bool("FAST_SEARCH", FAST_SEARCH)
+    STRUCTURE_SEARCH = get_bool("STRUCTURE_SEARCH", STRUCTURE_SEARCH)
+    INCREMENTAL_FITNESS = get_bool("INCREMENTAL_FITNESS", INCREMENTAL_FITNESS)
+    INCREMENTAL_MAX_CHANGES = get_float("INCREMENTAL_MAX_CHANGES", INCREMENTAL_MAX_CHANGES)
+    PROFILE_GA = get_bool("PROFILE_GA", PROFILE_GA)
+    PROFILE_TRACE = get_str("PROFILE_TRACE", PROFILE_TRACE)
     REPLACE_UNREACHABLE = get_bool("REPLACE_UNREACHABLE", REPLACE_UNREACHABLE)
     RENDER_MINECRAFT = get_bool("RENDER_MINECRAFT", RENDER_MINECRAFT)
+    MINECRAFT_FILL = get_bool("MINECRAFT_FILL", MINECRAFT_FILL)
+    MINECRAFT_CHUNK_SIZE = get_int("MINECRAFT_CHUNK_SIZE", MINECRAFT_CHUNK_SIZE)
+    MINECRAFT_WORKERS = get_int("MINECRAFT_WORKERS", MINECRAFT_WORKERS)
+    MINECRAFT_RETRIES = get_int("MINECRAFT_RETRIES", MINECRAFT_RETRIES)
+    MINECRAFT_STATE = get_str("MINECRAFT_STATE", MINECRAFT_STATE)
+    WEB_EXPORT = get_str("WEB_EXPORT", WEB_EXPORT).lower()
+    MAZE_FILE = get_str("MAZE_FILE", MAZE_FILE)
+    SCHEMATIC_FILE = get_str("SCHEMATIC_FILE", SCHEMATIC_FILE)
     REWARD_START = get_float("REWARD_START", REWARD_START)
     REWARD_END = get_float("REWARD_END", REWARD_END)
     REWARD_CLOSE_PATH = get_float("REWARD_CLOSE_PATH", REWARD_CLOSE_PATH)
@@ -221,6 +466,31 @@ def load_parameters(env_file):
     MAZE_END = (MAZE_HEIGHT - 1, MAZE_WIDTH - 2)
 
 
+def get_parameters():
+    return {
+        "METHOD_TO_USE": METHOD_TO_USE,
+        "MAZE_HEIGHT": MAZE_HEIGHT,
+        "MAZE_WIDTH": MAZE_WIDTH,
+        "MAZE_START": MAZE_START,
+        "MAZE_END": MAZE_END,
+        "FAST_SEARCH": FAST_SEARCH,
+        "STRUCTURE_SEARCH": STRUCTURE_SEARCH,
+        "REWARD_START": REWARD_START,
+        "REWARD_END": REWARD_END,
+        "REWARD_CLOSE_PATH": REWARD_CLOSE_PATH,
+        "REWARD_PATH": REWARD_PATH,
+        "REWARD_EXPL_EFFORT": REWARD_EXPL_EFFORT,
+        "REWARD_WALLS": REWARD_WALLS,
+        "REWARD_UNREACH_TILES": REWARD_UNREACH_TILES,
+        "REWARD_LOOPS": REWARD_LOOPS,
+    }
+
+
+def set_parameters(parameters):
+    # Used as worker initializer, so the maze configuration is sent once per process
+    globals().update(parameters)
+
+
 def check_parameters():
     if METHOD_TO_USE not in [USE_GENE_POOL_1, USE_GENE_POOL_2]:
         raise Exception("Method to use " + str(METHOD_TO_USE) + " does not exist")
@@ -239,10 +509,73 @@ def check_parameters():
     
     if POPULATION_SIZE < 1:
         raise Exception("Population size cannot be smaller than 1")
+
+    if ELITE_SIZE < 0:
+        raise Exception("Elite size cannot be negative")
+
+    if ELITE_SIZE >= POPULATION_SIZE:
+        raise Exception("Elite size must be smaller than the population size")
     
+    if ISLANDS < 0:
+        raise Exception("Islands cannot be smaller than 0")
+
+    if MIGRATION_INTERVAL < 1:
+        raise Exception("Migration interval cannot be smaller than 1")
+
+    if MIGRATION_SIZE < 0 or MIGRATION_SIZE > POPULATION_SIZE:
+        raise Exception("Migration size must be between 0 and the population size")
+
+    if MIGRATION_TOPOLOGY not in TOPOLOGIES:
+        raise Exception("Migration topology " + str(MIGRATION_TOPOLOGY) + " does not exist")
+
+    if FITNESS_WORKERS < 0:
+        raise Exception("Fitness workers cannot be smaller than 0")
+
+    if FITNESS_CACHE_SIZE < 0:
+        raise Exception("Fitness cache size cannot be smaller than 0")
+
     if MAX_GENERATIONS < 1:
         raise Exception("Max generations cannot be smaller than 1")
 
+    if STOP_STAGNATION < 0:
+        raise Exception("Stop stagnation cannot be negative")
+
+    if STOP_TIME_BUDGET < 0:
+        raise Exception("Stop time budget cannot be negative")
+
+    if STOP_EVALUATION_BUDGET < 0:
+        raise Exception("Stop evaluation budget cannot be negative")
+
+    if PACKED_GENOMES and METHOD_TO_USE != USE_GENE_POOL_1:
+        raise Exception("Packed genomes are only available with Gene Pool 1")
+
+    if INCREMENTAL_MAX_CHANGES < 0 or INCREMENTAL_MAX_CHANGES > 1:
+        raise Exception("Incremental max changes must be between 0 and 1")
+
+    if STRUCTURE_SEARCH and METHOD_TO_USE != USE_GENE_POOL_2:
+        raise Exception("Structure search is only available with Gene Pool 2")
+
+    if MINECRAFT_CHUNK_SIZE < 1:
+        raise Exception("Minecraft chunk size cannot be smaller than 1")
+
+    if MINECRAFT_WORKERS < 1:
+        raise Exception("Minecraft workers cannot be smaller than 1")
+
+    if MINECRAFT_RETRIES < 0:
+        raise Exception("Minecraft retries cannot be negative")
+
+    if WEB_EXPORT not in WEB_EXPORTS:
+        raise Exception("Web export " + str(WEB_EXPORT) + " does not exist")
+
+    if SEED != None and SEED < 0:
+        raise Exception("Seed cannot be negative")
+
+    if SELECTION not in SELECTIONS:
+        raise Exception("Selection " + str(SELECTION) + " does not exist")
+
+    if TOURNAMENT_SIZE < 1:
+        raise Exception("Tournament size cannot be smaller than 1")
+
 
 def print_parameters():
     print("## Parameters:")
@@ -250,9 +583,40 @@ def print_parameters():
     print("- MAZE_HEIGHT " + str(MAZE_HEIGHT))
     print("- MAZE_WIDTH " + str(MAZE_WIDTH))
     print("- POPULATION_SIZE " + str(POPULATION_SIZE))
+    print("- ELITE_SIZE " + str(ELITE_SIZE))
+    print("- ISLANDS " + str(ISLANDS))
+    print("- MIGRATION_INTERVAL " + str(MIGRATION_INTERVAL))
+    print("- MIGRATION_SIZE " + str(MIGRATION_SIZE))
+    print("- MIGRATION_TOPOLOGY " + str(MIGRATION_TOPOLOGY))
+    print("- FITNESS_WORKERS " + str(FITNESS_WORKERS))
+    print("- FITNESS_CACHE_SIZE " + str(FITNESS_CACHE_SIZE))
     print("- MAX_GENERATIONS " + str(MAX_GENERATIONS))
+    print("- STOP_STAGNATION " + str(STOP_STAGNATION))
+    print("- STOP_TARGET_SCORE " + str(STOP_TARGET_SCORE))
+    print("- STOP_TIME_BUDGET " + str(STOP_TIME_BUDGET))
+    print("- STOP_EVALUATION_BUDGET " + str(STOP_EVALUATION_BUDGET))
+    print("- SEED " + str(SEED))
+    print("- SELECTION " + str(SELECTION))
+    print("- TOURNAMENT_SIZE " + str(TOURNAMENT_SIZE))
+    print("- VECTORIZED_GA " + str(VECTORIZED_GA))
+    print("- PACKED_GENOMES " + str(PACKED_GENOMES))
+    print("- BATCH_FITNESS " + str(BATCH_FITNESS))
+    print("- FAST_SEARCH " + str(FAST_SEARCH))
+    print("- STRUCTURE_SEARCH " + str(STRUCTURE_SEARCH))
+    print("- INCREMENTAL_FITNESS " + str(INCREMENTAL_FITNESS))
+    print("- INCREMENTAL_MAX_CHANGES " + str(INCREMENTAL_MAX_CHANGES))
+    print("- PROFILE_GA " + str(PROFILE_GA))
+    print("- PROFILE_TRACE " + str(PROFILE_TRACE))
     print("- REPLACE_UNREACHABLE " + str(REPLACE_UNREACHABLE))
     print("- RENDER_MINECRAFT " + str(RENDER_MINECRAFT))
+    print("- MINECRAFT_FILL " + str(MINECRAFT_FILL))
+    print("- MINECRAFT_CHUNK_SIZE " + str(MINECRAFT_CHUNK_SIZE))
+    print("- MINECRAFT_WORKERS " + str(MINECRAFT_WORKERS))
+    print("- MINECRAFT_RETRIES " + str(MINECRAFT_RETRIES))
+    print("- MINECRAFT_STATE " + str(MINECRAFT_STATE))
+    print("- WEB_EXPORT " + str(WEB_EXPORT))
+    print("- MAZE_FILE " + str(MAZE_FILE))
+    print("- SCHEMATIC_FILE " + str(SCHEMATIC_FILE))
     print("- REWARD_START " + str(REWARD_START))
     print("- REWARD_END " + str(REWARD_END))
     print("- REWARD_CLOSE_PATH " + str(REWARD_CLOSE_PATH))
@@ -263,13 +627,45 @@ def print_parameters():
     print("- REWARD_LOOPS " + str(REWARD_LOOPS))
 
 
-def main():
-    # Load parameters (parse .env if it exists)
-    load_parameters(".env")
-    check_parameters()
-    print_parameters()
+def print_profile(ga):
+    totals = ga.get_stage_totals()
+    print("## Profile (" + str(ga.get_fitness_calls()) + " fitness calls):")
+    for stage, seconds in totals.items():
+        share = seconds / totals["total"] * 100.0 if totals["total"] > 0 else 0.0
+        print("- " + stage + " " + "{:.3f}".format(seconds) + "s (" + "{:.1f}".format(share) + "%)")
+
+    stats = ga.get_generation_stats()[-1]
+    print("- last generation: best " + str(stats["best"]) + ", mean " + "{:.2f}".format(stats["mean"])
+        + ", stagnation " + str(stats["stagnation"]))
 
-    # Set genome properties
+
+def print_upload(sent, total):
+    # Total is None when the number of items is only known at the end
+    print("## Minecraft: " + str(sent) + ("/" + str(total) if total != None else "") + " sent")
+
+
+def solve_maze(genome):
+    maze = genome_to_maze(genome)
+
+    # Run search algorithm
+    sa = create_search_algorithm(maze, genome)
+    sa.run()
+
+    # Replace unreachable tiles
+    if REPLACE_UNREACHABLE:
+        explored = sa.get_explored_locations()
+        maze = replace_unreachable(maze, explored)
+
+    # Convert locations
+    # [(row, col), ...] to [[row, col], ...]
+    locations = []
+    for pL in sa.get_path_locations():
+        locations.append(list(pL))
+
+    return maze, locations
+
+
+def get_genome_properties():
     genome_length = 0
     gene_pool = []
     
@@ -281,45 +677,77 @@ def main():
         genome_length = MAZE_HEIGHT * MAZE_WIDTH // STRUCT_SIDE // STRUCT_SIDE
         gene_pool = GENE_POOL_2
 
-    # Run genetic algorithm
-    ga = GeneticAlgorithm(genome_length, gene_pool, POPULATION_SIZE, MAX_GENERATIONS, fitness)
+    return genome_length, gene_pool
+
+
+def create_genetic_algorithm():
+    genome_length, gene_pool = get_genome_properties()
+
+    if VECTORIZED_GA:
+        ga = VectorizedGeneticAlgorithm(genome_length, gene_pool, POPULATION_SIZE, MAX_GENERATIONS, fitness, SEED)
+    else:
+        ga = GeneticAlgorithm(genome_length, gene_pool, POPULATION_SIZE, MAX_GENERATIONS, fitness, SEED)
     ga.set_crossover_points([ int(1.0 / 2.0 * genome_length) ])
     ga.set_mutation_probability(1.0 / 100.0)
+    ga.set_selection(SELECTION, TOURNAMENT_SIZE)
+    ga.set_elitism(ELITE_SIZE)
+    ga.set_stop_criteria(STOP_STAGNATION, STOP_TARGET_SCORE, STOP_TIME_BUDGET, STOP_EVALUATION_BUDGET)
+    if BATCH_FITNESS:
+        ga.set_fitness_batch(fitness_batch)
+    ga.set_workers(FITNESS_WORKERS, set_parameters, (get_parameters(),))
+    ga.set_fitness_cache(FITNESS_CACHE_SIZE)
+    ga.set_change_tracking(INCREMENTAL_FITNESS)
+    ga.set_packed_genomes(PACKED_GENOMES)
+    ga.set_profiling(PROFILE_GA or PROFILE_TRACE != None, PROFILE_TRACE)
+
+    # Same configuration for each island (population size is per island)
+    if ISLANDS > 1:
+        ga = IslandGeneticAlgorithm(ga, ISLANDS, MIGRATION_INTERVAL, MIGRATION_SIZE, MIGRATION_TOPOLOGY)
+    return ga
+
+
+def main():
+    # Load parameters (parse .env if it exists)
+    load_parameters(".env")
+    check_parameters()
+    print_parameters()
+
+    # Run genetic algorithm
+    ga = create_genetic_algorithm()
     ga.run()
+    ga.close()
 
     # Get best generated maze
     best_genome = ga.get_best_genome()
-    maze = genome_to_maze(best_genome.get_genome())
     print("## Best score: " + str(best_genome.get_score()))
+    print("## Seed: " + str(ga.get_seed()))
+    print("## Stopped: " + ga.get_stop_reason() + " after " + str(ga.get_generations()) + " generations")
+    if FITNESS_CACHE_SIZE > 0:
+        print("## Fitness cache: " + str(ga.get_cache_hits()) + " hits, " + str(ga.get_cache_misses()) + " misses")
+    if PROFILE_GA:
+        print_profile(ga)
     
-    # Run search algorithm
-    sa = SearchAlgorithm(MAZE_START, MAZE_END, maze, next_locations)
-    sa.run()
-
-    # Replace unreachable tiles
-    if REPLACE_UNREACHABLE:
-        explored = sa.get_explored_locations()
-        maze = replace_unreachable(maze, explored)
-
-    # Get path as locations
-    path_locations = sa.get_path_locations()
-
-    # Convert locations
-    # [(row, col), ...] to [[row, col], ...]
+    # Get the maze and its path
+    maze, locations = solve_maze(best_genome.get_genome())
     start = list(MAZE_START)
     end = list(MAZE_END)
-    
-    locations = []
-    for pL in path_locations:
-        locations.append(list(pL))
 
     # Render the maze (web)
-    mr = MazeRendered(MAZE_HEIGHT, MAZE_WIDTH, maze, start, end, locations)
-    mr.render_web()
+    mr = MazeRendered(MAZE_HEIGHT, MAZE_WIDTH, list(maze), start, end, locations)
+    mr.render_web(WEB_EXPORT)
+
+    # Save the maze (binary file)
+    if MAZE_FILE != None:
+        mr.render_file(MAZE_FILE)
+
+    # Save the Minecraft blocks (schematic file)
+    if SCHEMATIC_FILE != None:
+        mr.render_schematic(SCHEMATIC_FILE)
 
     # Render the maze (Minecraft)
     if RENDER_MINECRAFT:
-        mr.render_minecraft()
+        with MinecraftConnector(MINECRAFT_CHUNK_SIZE, MINECRAFT_WORKERS, MINECRAFT_RETRIES, print_upload) as mc:
+            mr.render_minecraft(MINECRAFT_FILL, mc, MINECRAFT_STATE)
 
 
 if __name__ == '__main__':
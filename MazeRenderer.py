@@ -1,7 +1,16 @@
 import os
+import base64
+import concurrent.futures
+import gzip
+import itertools
+import json
+import time
 import webbrowser
 import requests
+import requests.adapters
 import nbtlib
+from MazeFile import *
+import numpy as np
 
 
 VIEWER_PATH         = os.getcwd() + "/maze_viewer/viewer.html"
@@ -12,6 +21,25 @@ DATA_PATH           = "maze_viewer/data.js"
 
 URI_PLAYERS         = "http://localhost:9000/players?includeData=true"
 URI_BLOCK           = "http://localhost:9000/blocks"
+URI_COMMANDS        = "http://localhost:9000/commands"
+
+WEB_EXPORT_LIST     = "list" # Maze as a list of tiles, path as a list of locations (small mazes)
+WEB_EXPORT_BITS     = "bits" # Maze as base64 packed bits (one bit per tile), path as cell deltas
+WEB_EXPORT_RLE      = "rle"  # Maze as run lengths (alternating empty and wall tiles), path as cell deltas
+WEB_EXPORTS         = [WEB_EXPORT_LIST, WEB_EXPORT_BITS, WEB_EXPORT_RLE]
+
+MAX_FILL_VOLUME     = 32768 # Max number of blocks changed by one fill command (Minecraft limit)
+
+UPLOAD_CHUNK_SIZE   = 4096  # Blocks (or fill commands) sent in one request
+UPLOAD_WORKERS      = 4     # Requests sent at the same time
+UPLOAD_RETRIES      = 3     # Attempts after a failed request
+RETRY_DELAY         = 0.5   # Seconds before the first retry, doubled for each next retry
+REQUEST_TIMEOUT     = 60    # Seconds without an answer before a request fails
+JSON_HEADERS        = {"Content-Type": "application/json"}
+
+SCHEMATIC_VERSION       = 2     # Sponge schematic format (.schem, read by WorldEdit)
+SCHEMATIC_DATA_VERSION  = 3465  # Minecraft data version of the blocks (1.20.1)
+SCHEMATIC_COMPRESSION   = 6     # Gzip level of schematic files
 
 GRID_OFFSET         = 5 # How far from the player is the maze rendered (Y axis)
 WALL_HEIGHT         = 4
@@ -20,63 +48,258 @@ BLOCK_TYPE           = "minecraft:stone"
 BLOCK_TYPE_BORDER    = "minecraft:stone_bricks"
 BLOCK_TYPE_START     = "minecraft:green_wool"
 BLOCK_TYPE_END       = "minecraft:red_wool"
+BLOCK_TYPE_AIR       = "minecraft:air" # Clears a block (incremental render)
+
+COLUMN_EMPTY        = 0 # Tile without blocks
+COLUMN_WALL         = 1 # Tile with a maze wall
+COLUMN_BORDER       = 2 # Tile with a surrounding wall
+COLUMN_TYPES        = [None, BLOCK_TYPE, BLOCK_TYPE_BORDER] # Block type of each column
 
 
 class Position:
+    __slots__ = ("x", "z", "y") # No per-block dict, millions of blocks can be rendered
+
     def __init__(self, x, z, y):
         self.x = x # W and S keys
         self.z = z # A and D keys
         self.y = y # Space key (jump)
 
 
+class Region:
+    def __init__(self, x1, z1, y1, x2, z2, y2):
+        self.x1 = x1 # First corner
+        self.z1 = z1
+        self.y1 = y1
+        self.x2 = x2 # Opposite corner (included)
+        self.z2 = z2
+        self.y2 = y2
+
+
+def merge_tiles(mask):
+    # Rectangles (row1, col1, row2, col2) covering the true tiles of a 2D array:
+    # runs of each row, stacked with the identical runs of the next rows
+    rectangles = []
+    opened = {} # Run (col1, col2) -> first row
+    height = mask.shape[0]
+
+    for row in range(height + 1):
+        runs = []
+        if row < height:
+            padded = np.concatenate([[0], mask[row].astype(np.int8), [0]])
+            steps = np.diff(padded)
+            runs = list(zip(np.flatnonzero(steps == 1).tolist(), (np.flatnonzero(steps == -1) - 1).tolist()))
+
+        current = set(runs)
+        for run in [run for run in opened if run not in current]:
+            rectangles.append((opened.pop(run), run[0], row - 1, run[1]))
+
+        for run in runs:
+            if run not in opened:
+                opened[run] = row
+
+    return rectangles
+
+
+def get_chunks(items, size):
+    # Lists of at most size items, taken from any iterable as they are needed
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def encode_blocks(chunk):
+    # JSON body of a chunk of (block, type), written directly (no dict per block)
+    types = {} # Type -> JSON string, encoded once per chunk
+    parts = []
+
+    for block, type in chunk:
+        if type not in types:
+            types[type] = json.dumps(type)
+        parts.append('{"id":%s,"x":%d,"z":%d,"y":%d}' % (types[type], block.x, block.z, block.y))
+
+    return ("[" + ",".join(parts) + "]").encode()
+
+
+def get_total(groups):
+    # Number of items of all the groups, None when a group has no length (e.g. a generator)
+    total = 0
+    for group in groups:
+        if not hasattr(group, "__len__"):
+            return None
+        total += len(group)
+    return total
+
+
+def read_render_state(path):
+    # Maze rendered by the previous render_minecraft and its origin, None when there is no previous render
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        state = json.load(f)
+
+    height, width = state["height"], state["width"]
+    tiles = BitGrid(height * width, base64.b64decode(state["maze"]))
+    previous = MazeRendered(height, width, tiles.to_list(), state["start"], state["end"], [])
+    return previous, state["x"], state["z"], state["y"], state["wall_height"]
+
+
 class MinecraftConnector:
-    def __init__(self):
-        pass
+    def __init__(self, chunk_size=UPLOAD_CHUNK_SIZE, workers=UPLOAD_WORKERS, retries=UPLOAD_RETRIES, progress=None):
+        self.chunk_size = chunk_size    # Blocks (or commands) sent in one request
+        self.workers = workers          # Requests sent at the same time
+        self.retries = retries          # Attempts after a failed request (connection error, server error)
+        self.progress = progress        # Called with (sent, total) after each request, None -> no report
+        self.session = requests.Session() # Connections kept open between requests
 
-    def get_player_position(self):
+        # One connection per worker, so concurrent requests do not wait for a free connection
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+        self.session.mount("http://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Private
+    def _request(self, method, uri, **kwargs):
+        # Retry with a growing delay, the mod answers 5xx while the server is busy
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+            try:
+                response = self.session.request(method, uri, timeout=REQUEST_TIMEOUT, **kwargs)
+            except requests.RequestException:
+                if attempt == self.retries:
+                    raise
+                continue
+            if response.status_code < 500 or attempt == self.retries:
+                response.raise_for_status()
+                return response.json()
+
+    def _put_blocks(self, chunk):
         data = None
         try:
-            data = requests.get(URI_PLAYERS)
+            data = self._request("PUT", URI_BLOCK, data=encode_blocks(chunk), headers=JSON_HEADERS)
         except:
             raise Exception(
-                "Player position is not accessible, " \
+                "Blocks cannot be placed, " \
                 "make sure Minecraft is running with the GDMC HTTP interface mod"
             )
         
-        nbt = data.json()[0]["data"]
-        node = nbtlib.parse_nbt(nbt)
-        x, y, z = node["Pos"]
-        position = Position(float(x), float(z), float(y))
-
-        return position
-    
-    def add_blocks(self, blocks, type):
-        body = []
+        for object in data:
+            if object["status"] == 0:
+                raise Exception(
+                    "Blocks cannot be placed, " \
+                    "make sure the player is on a flat surface with no objects around"
+                )
 
-        for block in blocks:
-            body.append({
-                "id" : type,
-                "x"  : block.x,
-                "z"  : block.z,
-                "y"  : block.y 
-            })
+        return len(chunk)
 
+    def _post_commands(self, chunk):
         data = None
         try:
-            data = requests.put(URI_BLOCK, json=body)
+            data = self._request("POST", URI_COMMANDS, data="\n".join(chunk))
         except:
             raise Exception(
-                "Blocks cannot be placed, " \
+                "Regions cannot be filled, " \
                 "make sure Minecraft is running with the GDMC HTTP interface mod"
             )
-        
-        for object in data.json():
+
+        for object in data:
             if object["status"] == 0:
                 raise Exception(
-                    "Blocks cannot be placed, " \
-                    "make sure the player is on a flat surface with no objects around"
+                    "Regions cannot be filled: " + str(object.get("message"))
                 )
 
+        return len(chunk)
+
+    def _upload(self, items, total, send):
+        # Send the items by chunks through the worker threads,
+        # at most 2 chunks per worker are waiting so the chunks are built as they are sent
+        sent = 0
+        chunks = get_chunks(items, self.chunk_size)
+
+        with concurrent.futures.ThreadPoolExecutor(max(1, self.workers)) as executor:
+            pending = set()
+            try:
+                for chunk in chunks:
+                    if len(pending) >= 2 * self.workers:
+                        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                        sent = self._collect(done, sent, total)
+                    pending.add(executor.submit(send, chunk))
+
+                done, pending = concurrent.futures.wait(pending)
+                sent = self._collect(done, sent, total)
+            except:
+                # Do not start the chunks still waiting
+                for future in pending:
+                    future.cancel()
+                raise
+
+        return sent
+
+    def _collect(self, done, sent, total):
+        for future in done:
+            sent += future.result()
+            if self.progress != None:
+                self.progress(sent, total)
+        return sent
+
+    # Public
+    def get_player_position(self):
+        data = None
+        try:
+            data = self._request("GET", URI_PLAYERS)
+        except:
+            raise Exception(
+                "Player position is not accessible, " \
+                "make sure Minecraft is running with the GDMC HTTP interface mod"
+            )
+        
+        nbt = data[0]["data"]
+        node = nbtlib.parse_nbt(nbt)
+        x, y, z = node["Pos"]
+        position = Position(float(x), float(z), float(y))
+
+        return position
+    
+    def add_blocks(self, blocks, type):
+        return self.add_block_groups([(blocks, type)])
+
+    def add_block_groups(self, groups, total=None):
+        # Groups of (blocks, type), all sent in the same chunks.
+        # Blocks can be generators: only the chunks being sent are in memory
+        items = itertools.chain.from_iterable(
+            zip(blocks, itertools.repeat(type)) for blocks, type in groups
+        )
+        if total == None:
+            total = get_total(blocks for blocks, type in groups)
+        return self.add_typed_blocks(items, total)
+
+    def add_typed_blocks(self, items, total=None):
+        # (block, type) items of any types, e.g. the changes of an incremental render
+        return self._upload(items, total, self._put_blocks)
+
+    def fill_regions(self, regions, type):
+        return self.fill_region_groups([(regions, type)])
+
+    def fill_region_groups(self, groups):
+        # One fill command per region, groups of (regions, type) sent in the same chunks
+        commands = (
+            "fill " + str(r.x1) + " " + str(r.y1) + " " + str(r.z1) + " " \
+            + str(r.x2) + " " + str(r.y2) + " " + str(r.z2) + " " + type
+            for regions, type in groups for r in regions
+        )
+        return self._upload(commands, get_total(regions for regions, type in groups), self._post_commands)
+
+    def close(self):
+        self.session.close()
+
 
 class MazeRendered:
     def __init__(self, height, width, maze, start, end, path_locations):
@@ -89,29 +312,20 @@ class MazeRendered:
 
     # Private
     def _get_maze_blocks(self, x, z, y):
-        result = []
+        # Generator, blocks are made row by row as they are sent
+        tiles = self._get_tiles().reshape(self.height, self.width)
 
-        index = 0
         for row in range(self.height):
-            for col in range(self.width):
-                
-                if self.maze[index] == 0:
-                    index += 1
-                    continue
+            pz = z + row
 
+            for col in np.flatnonzero(tiles[row]).tolist():
                 px = x + col
-                pz = z + row
 
                 for wall in range(WALL_HEIGHT):
-                    position = Position(px, pz, y + wall)
-                    result.append(position)
+                    yield Position(px, pz, y + wall)
 
-                index += 1
-
-        return result
-
-    def _get_surrounding_blocks(self, x, z, y):
-        blocks = []
+    def _get_border_tiles(self):
+        tiles = []
 
         H, W = self.height, self.width
         start = tuple(self.start)
@@ -139,22 +353,122 @@ class MazeRendered:
             for r in (-1, H):
                 if (r, c) in doors:
                     continue
-                
-                px = x + c
-                pz = z + r
-                for h in range(WALL_HEIGHT):
-                    blocks.append(Position(px, pz, y + h))
+                tiles.append((r, c))
 
         for r in range(0, H):
             for c in (-1, W):
                 if (r, c) in doors:
                     continue
-                px = x + c
-                pz = z + r
-                for h in range(WALL_HEIGHT):
-                    blocks.append(Position(px, pz, y + h))
+                tiles.append((r, c))
 
-        return blocks
+        return tiles
+
+    def _get_surrounding_blocks(self, x, z, y):
+        # Generator, like _get_maze_blocks
+        for r, c in self._get_border_tiles():
+            px = x + c
+            pz = z + r
+            for h in range(WALL_HEIGHT):
+                yield Position(px, pz, y + h)
+
+    def _get_block_count(self):
+        # Blocks of the walls and the surroundings, without generating them
+        walls = int(np.count_nonzero(self._get_tiles())) + len(self._get_border_tiles())
+        return walls * WALL_HEIGHT
+
+    def _get_regions(self, mask, x, z, y):
+        # Wall boxes of the merged tiles, split to stay under the fill volume limit
+        regions = []
+        max_area = max(1, MAX_FILL_VOLUME // WALL_HEIGHT)
+
+        for row1, col1, row2, col2 in merge_tiles(mask):
+            width = min(col2 - col1 + 1, max_area)
+            rows = max(1, max_area // width)
+
+            for r in range(row1, row2 + 1, rows):
+                for c in range(col1, col2 + 1, width):
+                    regions.append(Region(
+                        x + c, z + r, y,
+                        x + min(c + width - 1, col2), z + min(r + rows - 1, row2), y + WALL_HEIGHT - 1
+                    ))
+
+        return regions
+
+    def _get_maze_regions(self, x, z, y):
+        mask = np.frombuffer(bytes(list(self.maze)), dtype=np.uint8).reshape(self.height, self.width) != 0
+        return self._get_regions(mask, x, z, y)
+
+    def _get_surrounding_regions(self, x, z, y):
+        # Border tiles are in rows/cols -1 to height/width, shifted by one in the mask
+        mask = np.zeros((self.height + 2, self.width + 2), dtype=bool)
+        for r, c in self._get_border_tiles():
+            mask[r + 1, c + 1] = True
+        return self._get_regions(mask, x - 1, z - 1, y)
+
+    def _get_columns(self):
+        # Column of each tile of the maze and its surroundings (shifted by one), see COLUMN_*
+        columns = np.zeros((self.height + 2, self.width + 2), dtype=np.uint8)
+        columns[1:-1, 1:-1] = self._get_tiles().reshape(self.height, self.width) * COLUMN_WALL
+        for r, c in self._get_border_tiles():
+            columns[r + 1, c + 1] = COLUMN_BORDER
+        return columns
+
+    def _get_column_types(self, column, row, col, wall_height):
+        # Block type at each height of a tile (None: no block), the start/end block replaces the top one
+        types = [COLUMN_TYPES[column]] * wall_height
+        if [row, col] == list(self.start):
+            types[-1] = BLOCK_TYPE_START
+        if [row, col] == list(self.end):
+            types[-1] = BLOCK_TYPE_END
+        return types
+
+    def _get_changed_blocks(self, previous, x, z, y, wall_height):
+        # Generator of the (block, type) turning the previous maze (rendered at the same origin) into this one,
+        # blocks that are no longer used are replaced with air
+        rows = max(self.height, previous.height) + 2
+        cols = max(self.width, previous.width) + 2
+
+        columns = np.zeros((rows, cols), dtype=np.uint8)
+        columns[:self.height + 2, :self.width + 2] = self._get_columns()
+        previous_columns = np.zeros((rows, cols), dtype=np.uint8)
+        previous_columns[:previous.height + 2, :previous.width + 2] = previous._get_columns()
+
+        # Start/end tiles are compared even when their column did not change,
+        # every wall is when the wall height changed
+        changed = columns != previous_columns
+        if wall_height != WALL_HEIGHT:
+            changed |= (columns != COLUMN_EMPTY) | (previous_columns != COLUMN_EMPTY)
+        for r, c in [self.start, self.end, previous.start, previous.end]:
+            changed[r + 1, c + 1] = True
+
+        for r, c in np.argwhere(changed).tolist():
+            types = self._get_column_types(columns[r, c], r - 1, c - 1, WALL_HEIGHT)
+            previous_types = previous._get_column_types(previous_columns[r, c], r - 1, c - 1, wall_height)
+
+            for h in range(max(len(types), len(previous_types))):
+                type = types[h] if h < len(types) else None
+                previous_type = previous_types[h] if h < len(previous_types) else None
+                if type == previous_type:
+                    continue
+                yield Position(x + c - 1, z + r - 1, y + h), type if type != None else BLOCK_TYPE_AIR
+
+    def _write_render_state(self, path, x, z, y):
+        state = {
+            "x": x,
+            "z": z,
+            "y": y,
+            "wall_height": WALL_HEIGHT,
+            "height": self.height,
+            "width": self.width,
+            "start": list(self.start),
+            "end": list(self.end),
+            "maze": base64.b64encode(pack_tiles(self.maze)).decode(),
+        }
+
+        # Replace the previous state only once the new one is complete
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
 
     def _get_start_block(self, x, z, y):
         px = x + self.start[1]
@@ -168,42 +482,153 @@ class MazeRendered:
         py = y + WALL_HEIGHT - 1
         return Position(px, pz, py)
 
-    # Public    
-    def render_web(self):
+    def _get_tiles(self):
+        return np.frombuffer(bytes(list(self.maze)), dtype=np.uint8)
+
+    def _get_runs(self):
+        # Lengths of the runs of identical tiles, the first run being empty tiles (can be 0)
+        tiles = self._get_tiles()
+        changes = np.flatnonzero(tiles[1:] != tiles[:-1]) + 1
+        bounds = np.concatenate([[0], changes, [len(tiles)]])
+        runs = np.diff(bounds).tolist()
+        if len(tiles) > 0 and tiles[0] != 0:
+            runs.insert(0, 0)
+        return runs
+
+    def _get_path_deltas(self):
+        # First cell, then the difference with the previous cell (mostly +-1 and +-width)
+        deltas = []
+        previous = 0
+        for row, col in self.path_locations:
+            cell = row * self.width + col
+            deltas.append(cell - previous)
+            previous = cell
+        return deltas
+
+    def _get_web_data(self, export):
         data = ""
         data += "var height = " + str(self.height) + ";" + "\n"
         data += "var width = " + str(self.width) + ";" + "\n"
-        data += "var maze = " + str(self.maze) + ";" + "\n"
+        data += "var mazeEncoding = \"" + export + "\";" + "\n"
+
+        if export == WEB_EXPORT_LIST:
+            data += "var maze = " + str(list(self.maze)) + ";" + "\n"
+        elif export == WEB_EXPORT_BITS:
+            data += "var maze = \"" + base64.b64encode(pack_tiles(self.maze)).decode() + "\";" + "\n"
+        elif export == WEB_EXPORT_RLE:
+            data += "var maze = " + str(self._get_runs()) + ";" + "\n"
+        else:
+            raise Exception("Web export " + str(export) + " does not exist")
+
         data += "var start = " + str(self.start) + ";" + "\n"
         data += "var end = " + str(self.end) + ";" + "\n"
-        data += "var pathLocations = " + str(self.path_locations) + ";" + "\n"
+
+        if export == WEB_EXPORT_LIST:
+            data += "var pathDeltas = null;" + "\n"
+            data += "var pathLocations = " + str(self.path_locations) + ";" + "\n"
+        else:
+            data += "var pathDeltas = " + str(self._get_path_deltas()) + ";" + "\n"
+            data += "var pathLocations = null;" + "\n"
+
+        return data
+
+    # Public    
+    def render_web(self, export=WEB_EXPORT_LIST):
+        data = self._get_web_data(export)
 
         with open(DATA_PATH, "w") as f:
             f.write(data)
 
         webbrowser.open_new_tab(VIEWER_PATH)
 
-    def render_minecraft(self):
-        mc = MinecraftConnector()
+    def render_file(self, path):
+        # Compact binary file (see MazeFile), readable with MazeReader
+        with MazeWriter(path) as writer:
+            writer.write(self.height, self.width, self.maze, self.start, self.end, self.path_locations)
+
+    def render_schematic(self, path):
+        # Sponge schematic of the blocks placed by render_minecraft (walls, surroundings, start and end),
+        # pasted in one operation (e.g. //schem load and //paste) without a game connection
+        palette = {} # Block type -> palette index
+
+        def get_index(type):
+            return palette.setdefault(type, len(palette))
+
+        # Blocks are indexed by (y, z, x), the surroundings start at 0
+        columns = self._get_columns()
+        indices = np.array([get_index(BLOCK_TYPE_AIR if t == None else t) for t in COLUMN_TYPES], dtype=np.uint8)
+        blocks = np.broadcast_to(indices[columns], (WALL_HEIGHT,) + columns.shape).copy()
+
+        for block, type in [(self._get_start_block(1, 1, 0), BLOCK_TYPE_START), (self._get_end_block(1, 1, 0), BLOCK_TYPE_END)]:
+            blocks[block.y, block.z, block.x] = get_index(type)
+
+        # Block data is varints in x, z, y order: indices below 128 are a single byte
+        if len(palette) > 128:
+            raise Exception("Schematic palette cannot have more than 128 block types")
+
+        length, width = columns.shape
+        schematic = nbtlib.File({
+            "Version": nbtlib.Int(SCHEMATIC_VERSION),
+            "DataVersion": nbtlib.Int(SCHEMATIC_DATA_VERSION),
+            "Width": nbtlib.Short(width),
+            "Height": nbtlib.Short(WALL_HEIGHT),
+            "Length": nbtlib.Short(length),
+            "Offset": nbtlib.IntArray([0, 0, 0]),
+            "PaletteMax": nbtlib.Int(len(palette)),
+            "Palette": nbtlib.Compound({type: nbtlib.Int(index) for type, index in palette.items()}),
+            "BlockData": nbtlib.ByteArray(blocks.reshape(-1).view(np.int8)),
+            # Paste position relative to the player, like render_minecraft
+            "Metadata": nbtlib.Compound({
+                "WEOffsetX": nbtlib.Int(-(self.width // 2) - 1),
+                "WEOffsetY": nbtlib.Int(0),
+                "WEOffsetZ": nbtlib.Int(GRID_OFFSET - 1),
+            }),
+        }, root_name="Schematic")
+
+        # Schematics are gzipped, nbtlib would use the slowest level
+        with gzip.open(path, "wb", compresslevel=SCHEMATIC_COMPRESSION) as f:
+            schematic.write(f)
+
+    def render_minecraft(self, fill=False, connector=None, state_path=None):
+        mc = connector if connector != None else MinecraftConnector()
+
+        # Previous render of the state file, the maze is changed in place
+        previous = read_render_state(state_path) if state_path != None else None
+
+        if previous != None:
+            # Only the blocks that differ are sent (each block once, chunks can be placed in any order)
+            previous_maze, x, z, y, wall_height = previous
+            mc.add_typed_blocks(self._get_changed_blocks(previous_maze, x, z, y, wall_height))
+        else:
+            # Get player position
+            position = mc.get_player_position()
+            x = int(position.x - self.width / 2)
+            z = int(position.z + GRID_OFFSET)
+            y = int(position.y)
+
+            if fill:
+                # Fill merged wall boxes (far fewer entries than blocks)
+                mc.fill_region_groups([
+                    (self._get_maze_regions(x, z, y), BLOCK_TYPE),
+                    (self._get_surrounding_regions(x, z, y), BLOCK_TYPE_BORDER),
+                ])
+            else:
+                # Add blocks to construct the maze and the surroundings (streamed, see _get_maze_blocks)
+                mc.add_block_groups([
+                    (self._get_maze_blocks(x, z, y), BLOCK_TYPE),
+                    (self._get_surrounding_blocks(x, z, y), BLOCK_TYPE_BORDER),
+                ], self._get_block_count())
+
+            # Start and end blocks once the walls are placed (chunks are placed in any order,
+            # a wall on the start or end tile must not replace its marker)
+            mc.add_block_groups([
+                ([self._get_start_block(x, z, y)], BLOCK_TYPE_START),
+                ([self._get_end_block(x, z, y)], BLOCK_TYPE_END),
+            ])
         
-        # Get player position
-        position = mc.get_player_position()
-        x = int(position.x - self.width / 2)
-        z = int(position.z + GRID_OFFSET)
-        y = int(position.y)
-
-        # Add blocks to construct maze
-        blocks = self._get_maze_blocks(x, z, y)
-        mc.add_blocks(blocks, BLOCK_TYPE)
-
-        # Add blocks to construct the surroundings
-        blocks = self._get_surrounding_blocks(x, z, y)
-        mc.add_blocks(blocks, BLOCK_TYPE_BORDER)
-
-        # Add start blocks
-        blocks = [self._get_start_block(x, z, y)]
-        mc.add_blocks(blocks, BLOCK_TYPE_START)
-
-        # Add end blocks
-        blocks = [self._get_end_block(x, z, y)]
-        mc.add_blocks(blocks, BLOCK_TYPE_END)
\ No newline at end of file
+        # Kept when an upload fails: sending the same changes again is harmless
+        if state_path != None:
+            self._write_render_state(state_path, x, z, y)
+
+        if connector == None:
+            mc.close()
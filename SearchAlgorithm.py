@@ -1,5 +1,56 @@
 import math
 from collections import deque
+import numpy as np
+from BitGrid import *
+from Structures import *
+
+
+_neighbours = {} # Neighbour cells of each cell, cached by (height, width)
+
+
+def get_neighbours(height, width):
+    # Flat indices of the neighbours of each cell, in the order of next_locations: south, north, west, east
+    key = (height, width)
+    if key not in _neighbours:
+        neighbours = []
+        for row in range(height):
+            for col in range(width):
+                cell = row * width + col
+                cells = []
+                if row < height - 1:
+                    cells.append(cell + width)
+                if row > 0:
+                    cells.append(cell - width)
+                if col > 0:
+                    cells.append(cell - 1)
+                if col < width - 1:
+                    cells.append(cell + 1)
+                neighbours.append(tuple(cells))
+        _neighbours[key] = neighbours
+    return _neighbours[key]
+
+
+_struct_neighbours = {} # Neighbour structures of each structure, cached by (rows, cols)
+
+_DIRECTIONS = [(1, 0), (-1, 0), (0, -1), (0, 1)] # Row and column steps: south, north, west, east
+_OPPOSITE = [1, 0, 3, 2]                          # Opposite direction: south <-> north, west <-> east
+
+
+def get_struct_neighbours(rows, cols):
+    # Neighbour structure in each direction (south, north, west, east), -1 on the border
+    key = (rows, cols)
+    if key not in _struct_neighbours:
+        neighbours = []
+        for row in range(rows):
+            for col in range(cols):
+                cells = []
+                for d_row, d_col in _DIRECTIONS:
+                    r, c = row + d_row, col + d_col
+                    in_grid = r >= 0 and r < rows and c >= 0 and c < cols
+                    cells.append(r * cols + c if in_grid else -1)
+                neighbours.append(tuple(cells))
+        _struct_neighbours[key] = neighbours
+    return _struct_neighbours[key]
 
 
 class Node:
@@ -120,4 +171,537 @@ class SearchAlgorithm:
                 # Add to frontier
                 child = Node(node, next_location)
                 child.steps = node.steps + 1
-                frontier.append(child)
\ No newline at end of file
+                frontier.append(child)
+
+
+class FlatSearchAlgorithm:
+    def __init__(self, start, end, grid, height, width):
+        self.start = start      # Start location
+        self.end = end          # End location
+        self.grid = grid        # Grid as a list of tiles, 0 -> empty tile
+        self.height = height    # Height of the grid
+        self.width = width      # Width of the grid
+
+        size = height * width
+        self.neighbours = get_neighbours(height, width) # Neighbour cells of each cell
+        self.parents = [-1] * size      # Parent cell of each explored cell
+        self.distances = [-1] * size    # Steps from start of each explored cell (-1 -> not explored)
+        self.queue = [0] * size         # Explored cells in BFS order (frontier is queue[head:tail])
+        self.unexplored = [-1] * size   # Used to reset distances between runs
+
+        self.path = None                # End cell when a path is found
+        self.path_locations = []        # Locations from start to end
+
+        self.expanded = 0               # Number of expanded locations before finding the path
+        self.closest_distance = math.inf # Closest Manhattan distance before finding the path
+
+        self.explored = 0               # Number of accessible locations from start
+        self.revisited = 0              # Number of revisited locations
+
+    # Public
+    def get_path(self):
+        return self.path
+
+    def get_steps(self):
+        result = 0
+        if self.path != None:
+            result = self.distances[self.path]
+        return result
+
+    def get_path_locations(self):
+        if self.path == None:
+            return self.path_locations
+
+        if len(self.path_locations) != 0:
+            return self.path_locations
+
+        cell = self.path
+        while cell != -1:
+            self.path_locations.append(divmod(cell, self.width))
+            cell = self.parents[cell]
+
+        # Start to end (and not the inverse)
+        self.path_locations.reverse()
+
+        return self.path_locations
+
+    def get_expanded(self):
+        return self.expanded
+
+    def get_closest_distance(self):
+        return self.closest_distance
+
+    def get_explored_locations(self):
+        width = self.width
+        return {divmod(cell, width) for cell in self.queue[:self.explored]}
+
+    def get_explored_cells(self):
+        return self.queue[:self.explored]
+
+    def get_explored(self):
+        return self.explored
+
+    def get_revisited(self):
+        return self.revisited
+
+    def set_grid(self, grid):
+        # Reuse the preallocated arrays for another grid of the same size
+        self.grid = grid
+
+    def run(self):
+        self.path = None
+        self.path_locations = []
+
+        self.expanded = 0
+        self.closest_distance = math.inf
+
+        self.explored = 0
+        self.revisited = 0
+
+        grid = self.grid
+        width = self.width
+        neighbours = self.neighbours
+
+        # One byte per tile, faster to index than bits
+        if isinstance(grid, BitGrid):
+            grid = grid.unpack()
+
+        parents = self.parents
+        distances = self.distances
+        queue = self.queue
+        distances[:] = self.unexplored
+
+        end = self.end[0] * width + self.end[1]
+        end_row, end_col = self.end
+
+        # Init
+        start = self.start[0] * width + self.start[1]
+        parents[start] = -1
+        distances[start] = 0
+        queue[0] = start
+        head = 0
+        tail = 1
+
+        path = None
+        expanded = 0
+        closest_distance = math.inf
+        revisited = 0
+
+        while head < tail:
+            cell = queue[head]
+            head += 1
+
+            if path == None:
+                # Count expanded locations
+                expanded += 1
+
+                # Calculate closest distance
+                row, col = divmod(cell, width)
+                distance = abs(row - end_row) + abs(col - end_col)
+                if distance < closest_distance:
+                    closest_distance = distance
+
+                # Goal reached?
+                if cell == end:
+                    path = cell
+
+            # Add children to frontier
+            parent = parents[cell]
+            steps = distances[cell] + 1
+
+            for next_cell in neighbours[cell]:
+                # Passable?
+                if grid[next_cell] != 0:
+                    continue
+
+                # Already explored?
+                if distances[next_cell] != -1:
+                    # Different from parent ?
+                    if parent != -1 and next_cell != parent:
+                        revisited += 1
+                    continue
+
+                # Add to explored and to frontier
+                parents[next_cell] = cell
+                distances[next_cell] = steps
+                queue[tail] = next_cell
+                tail += 1
+
+        self.path = path
+        self.expanded = expanded
+        self.closest_distance = closest_distance
+        self.revisited = revisited
+        self.explored = tail
+
+
+class BatchSearchAlgorithm:
+    def __init__(self, start, end, grids, height, width):
+        self.start = start      # Start location
+        self.end = end          # End location
+        self.grids = grids      # Grids as a (count, height * width) array of tiles, 0 -> empty tile
+        self.height = height    # Height of each grid
+        self.width = width      # Width of each grid
+
+        count = len(grids)
+        self.steps = np.full(count, -1)             # Steps from start to end for each grid (-1 when no path)
+        self.expanded = np.zeros(count, np.int64)   # Number of expanded locations before finding the path
+        self.closest_distance = np.full(count, math.inf) # Closest Manhattan distance before finding the path
+        self.explored = np.zeros(count, np.int64)   # Number of accessible locations from start
+        self.revisited = np.zeros(count, np.int64)  # Number of revisited locations
+
+    # Public
+    def get_found(self):
+        return self.steps >= 0
+
+    def get_steps(self):
+        return self.steps
+
+    def get_expanded(self):
+        return self.expanded
+
+    def get_closest_distance(self):
+        return self.closest_distance
+
+    def get_explored(self):
+        return self.explored
+
+    def get_revisited(self):
+        return self.revisited
+
+    def run(self):
+        # Runs one BFS per grid, level by level, with the frontiers of all grids in a single array.
+        # Cells are flat indices (grid * size + row * width + col) and each frontier keeps the
+        # order of the deque in SearchAlgorithm, so all metrics match the serial search exactly.
+        count = len(self.grids)
+        size = self.height * self.width
+        end_row, end_col = self.end
+
+        self.steps = np.full(count, -1)
+        self.expanded = np.zeros(count, np.int64)
+        self.closest_distance = np.full(count, math.inf)
+        self.explored = np.ones(count, np.int64)
+        self.revisited = np.zeros(count, np.int64)
+
+        if count == 0:
+            return
+
+        passable = np.asarray(self.grids).reshape(-1) == 0
+        explored = np.zeros(count * size, dtype=bool)
+
+        # Init (the start location is explored even if it is a wall, like in SearchAlgorithm)
+        frontier = np.arange(count) * size + self.start[0] * self.width + self.start[1]
+        parents = np.full(count, -1)
+        explored[frontier] = True
+
+        # Neighbour offsets in the order of next_locations: south, north, west, east
+        offsets = np.array([self.width, -self.width, -1, 1])
+
+        steps = 0
+        while len(frontier) > 0:
+            grid = frontier // size
+            cell = frontier - grid * size
+            row = cell // self.width
+            col = cell - row * self.width
+
+            # Count expanded locations and closest distance until the path is found
+            searching = self.steps[grid] < 0
+            distance = np.abs(row - end_row) + np.abs(col - end_col)
+            np.minimum.at(self.closest_distance, grid[searching], distance[searching])
+            level_expanded = np.bincount(grid[searching], minlength=count)
+
+            # Goal reached? (expanded stops at the goal position in the frontier)
+            goal = np.nonzero(searching & (distance == 0))[0]
+            goal_grid = grid[goal]
+            first = np.searchsorted(grid, goal_grid, side="left")
+            level_expanded[goal_grid] = goal - first + 1
+            self.expanded += level_expanded
+            self.steps[goal_grid] = steps
+
+            # Next locations of each frontier location, in the same order as the serial search
+            neighbours = frontier[:, None] + offsets
+            in_grid = np.stack([row < self.height - 1, row > 0, col > 0, col < self.width - 1], axis=1)
+            neighbours = neighbours[in_grid]
+            valid = passable[neighbours]
+            neighbours = neighbours[valid]
+            grandparents = np.broadcast_to(parents[:, None], in_grid.shape)[in_grid][valid]
+            parents_of_neighbours = np.broadcast_to(frontier[:, None], in_grid.shape)[in_grid][valid]
+
+            # Keep the first occurrence of each unexplored location
+            new = np.nonzero(~explored[neighbours])[0]
+            _, first = np.unique(neighbours[new], return_index=True)
+            new = new[np.sort(first)]
+            is_new = np.zeros(len(neighbours), dtype=bool)
+            is_new[new] = True
+
+            # Count revisited locations (already explored and different from parent)
+            revisited = ~is_new & (grandparents >= 0) & (neighbours != grandparents)
+            self.revisited += np.bincount(neighbours[revisited] // size, minlength=count)
+
+            # Add to explored and to the next frontier
+            frontier = neighbours[new]
+            parents = parents_of_neighbours[new]
+            explored[frontier] = True
+            self.explored += np.bincount(frontier // size, minlength=count)
+            steps += 1
+
+
+class StructureSearchAlgorithm:
+    def __init__(self, start, end, genome, height, width):
+        self.start = start      # Start location (a structure opening on the maze border)
+        self.end = end          # End location (a structure opening on the maze border)
+        self.genome = genome    # Structures as a list of structure ids (Gene Pool 2 genome)
+        self.height = height    # Height of the maze in tiles
+        self.width = width      # Width of the maze in tiles
+
+        if STRUCT_SIDE != 3:
+            raise Exception("Structure search needs structures of 3 x 3 tiles")
+
+        self.rows = height // STRUCT_SIDE # Structures per column
+        self.cols = width // STRUCT_SIDE  # Structures per row
+        self.start_struct, self.start_direction = self._get_border_opening(start)
+        self.end_struct, self.end_direction = self._get_border_opening(end)
+
+        count = self.rows * self.cols
+        self.neighbours = get_struct_neighbours(self.rows, self.cols) # Neighbour structures of each structure
+        self.openings = []              # Openings of each structure (start opening always open)
+        self.parents = [-1] * count     # Parent structure of each reached structure
+        self.levels = [-1] * count      # Structure steps from start of each reached structure (-1 -> not reached)
+        self.queue = [0] * count        # Reached structures in BFS order
+        self.unreached = [-1] * count   # Used to reset levels between runs
+        self.reached = 0                # Number of reached structures
+
+        self.path = None                # End cell when a path is found
+        self.path_locations = []        # Locations from start to end
+
+        self.expanded = 0               # Number of expanded locations before finding the path
+        self.closest_distance = math.inf # Closest Manhattan distance before finding the path
+
+        self.explored = 0               # Number of accessible locations from start
+        self.revisited = 0              # Number of revisited locations
+
+    # Private
+    def _get_border_opening(self, location):
+        row, col = location
+        struct = row // STRUCT_SIDE * self.cols + col // STRUCT_SIDE
+        local = (row % STRUCT_SIDE, col % STRUCT_SIDE)
+
+        if local == (2, 1) and row == self.height - 1:
+            return struct, 0
+        if local == (0, 1) and row == 0:
+            return struct, 1
+        if local == (1, 0) and col == 0:
+            return struct, 2
+        if local == (1, 2) and col == self.width - 1:
+            return struct, 3
+
+        raise Exception("Start and end must be structure openings on the maze border")
+
+    def _get_center(self, struct):
+        row, col = divmod(struct, self.cols)
+        return (row * STRUCT_SIDE + 1, col * STRUCT_SIDE + 1)
+
+    def _get_opening(self, struct, direction):
+        row, col = self._get_center(struct)
+        d_row, d_col = _DIRECTIONS[direction]
+        return (row + d_row, col + d_col)
+
+    def _is_entry(self, struct, direction):
+        # Opening reached from the neighbour structure (one level closer to start)
+        neighbour = self.neighbours[struct][direction]
+        return (
+            neighbour != -1
+            and self.openings[neighbour][_OPPOSITE[direction]]
+            and self.levels[neighbour] == self.levels[struct] - 1
+        )
+
+    # Public
+    def get_path(self):
+        return self.path
+
+    def get_steps(self):
+        result = 0
+        if self.path != None:
+            result = self.levels[self.end_struct] * STRUCT_SIDE + 2
+        return result
+
+    def get_path_locations(self):
+        if self.path == None:
+            return self.path_locations
+
+        if len(self.path_locations) != 0:
+            return self.path_locations
+
+        # Structures from start to end
+        structs = []
+        struct = self.end_struct
+        while struct != -1:
+            structs.append(struct)
+            struct = self.parents[struct]
+        structs.reverse()
+
+        # Start opening, then center, exit and entry openings of each structure, then end opening
+        self.path_locations.append(tuple(self.start))
+        for i, struct in enumerate(structs):
+            self.path_locations.append(self._get_center(struct))
+            if i + 1 < len(structs):
+                direction = self.neighbours[struct].index(structs[i + 1])
+                self.path_locations.append(self._get_opening(struct, direction))
+                self.path_locations.append(self._get_opening(structs[i + 1], _OPPOSITE[direction]))
+        self.path_locations.append(tuple(self.end))
+
+        return self.path_locations
+
+    def get_expanded(self):
+        return self.expanded
+
+    def get_closest_distance(self):
+        return self.closest_distance
+
+    def get_explored_locations(self):
+        locations = set()
+        for struct in self.queue[:self.reached]:
+            locations.add(self._get_center(struct))
+            for direction in range(4):
+                if self.openings[struct][direction]:
+                    locations.add(self._get_opening(struct, direction))
+        return locations
+
+    def get_explored_cells(self):
+        cells = []
+        offsets = [self.width, -self.width, -1, 1]
+        for struct in self.queue[:self.reached]:
+            row, col = self._get_center(struct)
+            center = row * self.width + col
+            cells.append(center)
+            for direction in range(4):
+                if self.openings[struct][direction]:
+                    cells.append(center + offsets[direction])
+        return cells
+
+    def get_explored(self):
+        return self.explored
+
+    def get_revisited(self):
+        return self.revisited
+
+    def run(self):
+        # BFS on the structure graph. The tile graph is a star per structure (center and openings),
+        # so the tile BFS order follows the structure BFS order and all tile metrics can be derived.
+        self.path = None
+        self.path_locations = []
+
+        self.expanded = 0
+        self.closest_distance = math.inf
+
+        self.explored = 0
+        self.revisited = 0
+
+        # The search starts from the start opening, like the tile search (even if it is a wall)
+        openings = [STRUCT_OPENINGS[struct_id] for struct_id in self.genome]
+        start_opening = list(openings[self.start_struct])
+        start_opening[self.start_direction] = True
+        openings[self.start_struct] = tuple(start_opening)
+        self.openings = openings
+
+        neighbours = self.neighbours
+        parents = self.parents
+        levels = self.levels
+        queue = self.queue
+        levels[:] = self.unreached
+
+        # Init
+        start = self.start_struct
+        parents[start] = -1
+        levels[start] = 0
+        queue[0] = start
+        head = 0
+        tail = 1
+        links = 0
+        explored = 0
+
+        while head < tail:
+            struct = queue[head]
+            head += 1
+
+            # Each structure has a center and its openings
+            opening = openings[struct]
+            explored += 1 + sum(opening)
+            level = levels[struct] + 1
+            neighbour_structs = neighbours[struct]
+
+            for direction in range(4):
+                neighbour = neighbour_structs[direction]
+                if neighbour == -1 or not opening[direction] or not openings[neighbour][_OPPOSITE[direction]]:
+                    continue
+
+                # Linked structures (counted from both sides)
+                links += 1
+
+                if levels[neighbour] == -1:
+                    parents[neighbour] = struct
+                    levels[neighbour] = level
+                    queue[tail] = neighbour
+                    tail += 1
+
+        self.reached = tail
+        links //= 2
+
+        # Each independent cycle is revisited twice
+        self.explored = explored
+        self.revisited = 2 * (links - tail + 1)
+
+        end = self.end_struct
+        found = levels[end] != -1 and openings[end][self.end_direction]
+
+        if not found:
+            # Everything reachable was expanded, closest distance over all explored tiles
+            # (an opening is one step closer than its center when it points to the end)
+            end_row, end_col = self.end
+            self.expanded = explored
+            for struct in queue[:tail]:
+                row, col = self._get_center(struct)
+                opening = openings[struct]
+                distance = abs(row - end_row) + abs(col - end_col)
+                if (
+                    (end_row > row and opening[0]) or (end_row < row and opening[1])
+                    or (end_col < col and opening[2]) or (end_col > col and opening[3])
+                ):
+                    distance -= 1
+                if distance < self.closest_distance:
+                    self.closest_distance = distance
+            return
+
+        self.path = self.end[0] * self.width + self.end[1]
+        self.closest_distance = 0
+
+        # Count tiles expanded before the end (tile steps: start 0, center 3 * level + 1,
+        # openings from the center one more, openings from a closer neighbour one less)
+        end_level = levels[end]
+        end_reached = False
+        expanded = 1
+        for struct in queue[:tail]:
+            level = levels[struct]
+            if level > end_level:
+                break
+
+            expanded += 1
+            for direction in range(4):
+                if not openings[struct][direction]:
+                    continue
+                if struct == start and direction == self.start_direction:
+                    continue
+
+                if self._is_entry(struct, direction) or level < end_level:
+                    expanded += 1
+                elif struct == end:
+                    # Openings of the end level are expanded in BFS order: structures, then directions
+                    if direction < self.end_direction:
+                        expanded += 1
+                elif not end_reached:
+                    expanded += 1
+
+            if struct == end:
+                end_reached = True
+
+        # The end itself
+        self.expanded = expanded + 1
\ No newline at end of file
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 TILE_EMPTY      = 0
 TILE_WALL       = 1
 
@@ -82,4 +85,19 @@ STRUCT[STRUCT_T_4] = [
     TILE_WALL, TILE_EMPTY, TILE_WALL,
     TILE_WALL, TILE_EMPTY, TILE_EMPTY,
     TILE_WALL, TILE_EMPTY, TILE_WALL
-]
\ No newline at end of file
+]
+
+
+# Openings of each structure (empty middle tile of a side), in the order of the search: south, north, west, east
+STRUCT_OPENINGS = [
+    (
+        struct[(STRUCT_SIDE - 1) * STRUCT_SIDE + STRUCT_SIDE // 2] == TILE_EMPTY,
+        struct[STRUCT_SIDE // 2] == TILE_EMPTY,
+        struct[STRUCT_SIDE // 2 * STRUCT_SIDE] == TILE_EMPTY,
+        struct[STRUCT_SIDE // 2 * STRUCT_SIDE + STRUCT_SIDE - 1] == TILE_EMPTY
+    )
+    for struct in STRUCT
+]
+
+# All structures as a (STRUCT_NUMBER, STRUCT_SIDE, STRUCT_SIDE) array of tiles (used to decode genomes at once)
+STRUCT_ATLAS = np.array(STRUCT, dtype=np.uint8).reshape(STRUCT_NUMBER, STRUCT_SIDE, STRUCT_SIDE)
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# Modules of the repository are imported from its root (flat layout)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import MazeGenerator as mg
+
+
+@pytest.fixture
+def parameters():
+    # Settings are module globals, restore them after each test
+    saved = {key: value for key, value in vars(mg).items() if key.isupper()}
+
+    def set_parameters(values):
+        mg.set_parameters(values)
+        mg.MAZE_END = (mg.MAZE_HEIGHT - 1, mg.MAZE_WIDTH - 2)
+        mg.check_parameters()
+
+    yield set_parameters
+    mg.set_parameters(saved)
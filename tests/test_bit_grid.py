@@ -0,0 +1,14 @@
+from BitGrid import BitGrid
+
+import random
+
+
+def test_count_and_unpack():
+    rng = random.Random(0)
+    for length in [0, 1, 7, 8, 9, 225, 1000]:
+        tiles = [rng.randint(0, 1) for i in range(length)]
+        grid = BitGrid.from_list(tiles)
+
+        assert grid.to_list() == tiles
+        assert grid.count(1) == sum(tiles)
+        assert grid.count(0) == length - sum(tiles)
@@ -0,0 +1,208 @@
+from BitGrid import BitGrid
+from GeneticAlgorithm import Genome
+import MazeGenerator as mg
+
+import random
+
+import pytest
+
+
+def get_fresh_score(genome):
+    # Score of the genes alone (no parent, no cache)
+    fresh = Genome(genome.genome_length, genome.gene_pool)
+    fresh.set_genome(genome.get_genome().copy())
+    fresh.set_score(mg.fitness(fresh))
+    return fresh.get_score()
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_incremental_cached_scores_match_fitness(parameters, seed):
+    # Reused child buffers must not keep the data of a previous genome
+    parameters({
+        "METHOD_TO_USE": mg.USE_GENE_POOL_2,
+        "MAZE_HEIGHT": 15,
+        "MAZE_WIDTH": 15,
+        "POPULATION_SIZE": 30,
+        "MAX_GENERATIONS": 30,
+        "INCREMENTAL_FITNESS": True,
+        "FITNESS_CACHE_SIZE": 1000,
+        "SEED": seed,
+    })
+    ga = mg.create_genetic_algorithm()
+
+    mismatches = []
+
+    def check(ga):
+        for genome in ga.population:
+            if genome.get_score() != get_fresh_score(genome):
+                mismatches.append(genome.get_score())
+
+    ga.set_migration(check)
+    ga.run()
+    ga.close()
+
+    assert ga.get_generations() == 30
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("settings", [
+    {"FITNESS_WORKERS": 2},
+    {"BATCH_FITNESS": True},
+    {"BATCH_FITNESS": True, "VECTORIZED_GA": True},
+    {"BATCH_FITNESS": True, "PACKED_GENOMES": True},
+])
+def test_generation_of_cache_hits(parameters, settings):
+    # Elites and cached children only: nothing is left to evaluate in some generations
+    parameters({
+        "METHOD_TO_USE": mg.USE_GENE_POOL_1,
+        "MAZE_HEIGHT": 15,
+        "MAZE_WIDTH": 15,
+        "POPULATION_SIZE": 10,
+        "ELITE_SIZE": 9,
+        "MAX_GENERATIONS": 30,
+        "FITNESS_CACHE_SIZE": 100,
+        "SEED": 3,
+        **settings,
+    })
+    ga = mg.create_genetic_algorithm()
+    ga.run()
+    ga.close()
+
+    assert ga.get_generations() == 30
+    assert ga.get_fitness_calls() < 10 * 31
+
+
+def test_fitness_batch_without_genomes(parameters):
+    parameters({"METHOD_TO_USE": mg.USE_GENE_POOL_1, "MAZE_HEIGHT": 15, "MAZE_WIDTH": 15})
+    assert mg.genomes_to_array([]).shape == (0, 15 * 15)
+    assert len(mg.fitness_batch([])) == 0
+
+
+def test_island_profiling(parameters):
+    parameters({
+        "METHOD_TO_USE": mg.USE_GENE_POOL_1,
+        "MAZE_HEIGHT": 15,
+        "MAZE_WIDTH": 15,
+        "POPULATION_SIZE": 10,
+        "MAX_GENERATIONS": 3,
+        "ISLANDS": 2,
+        "SEED": 0,
+    })
+    ga = mg.create_genetic_algorithm()
+    ga.set_profiling(True)
+    ga.run()
+    ga.close()
+
+    assert ga.get_stage_totals()["total"] > 0
+    assert len(ga.get_generation_stats()) == 4
+
+
+def test_stop_reasons_are_not_shadowed(parameters):
+    parameters({
+        "METHOD_TO_USE": mg.USE_GENE_POOL_1,
+        "MAZE_HEIGHT": 15,
+        "MAZE_WIDTH": 15,
+        "POPULATION_SIZE": 10,
+        "MAX_GENERATIONS": 100,
+        "STOP_EVALUATION_BUDGET": 50,
+        "SEED": 0,
+    })
+    ga = mg.create_genetic_algorithm()
+    ga.run()
+
+    assert ga.get_stop_reason() == mg.REASON_EVALUATION_BUDGET
+    assert mg.STOP_EVALUATION_BUDGET == 50
+
+
+def test_generation_stats_are_per_generation(parameters):
+    parameters({
+        "METHOD_TO_USE": mg.USE_GENE_POOL_1,
+        "MAZE_HEIGHT": 15,
+        "MAZE_WIDTH": 15,
+        "POPULATION_SIZE": 10,
+        "ELITE_SIZE": 5,
+        "MAX_GENERATIONS": 20,
+        "FITNESS_CACHE_SIZE": 100,
+        "SEED": 3,
+    })
+    ga = mg.create_genetic_algorithm()
+    ga.set_profiling(True)
+    ga.run()
+
+    stats = ga.get_generation_stats()
+    assert sum(s["fitness_calls"] for s in stats) == ga.get_fitness_calls()
+    assert sum(s["cache_hits"] for s in stats) == ga.get_cache_hits()
+    assert all(ga.get_stage_totals()[stage] > 0 for stage in ["selection", "crossover", "mutation", "fitness"])
+
+
+@pytest.mark.parametrize("settings", [
+    {"METHOD_TO_USE": mg.USE_GENE_POOL_1, "PACKED_GENOMES": True},
+    {"METHOD_TO_USE": mg.USE_GENE_POOL_2, "FITNESS_CACHE_SIZE": 100},
+])
+def test_vectorized_batch_fitness_gets_the_matrix(parameters, settings):
+    # Rows go to the batch fitness without genomes, the run must not change
+    parameters({
+        "MAZE_HEIGHT": 15,
+        "MAZE_WIDTH": 15,
+        "POPULATION_SIZE": 20,
+        "ELITE_SIZE": 2,
+        "MAX_GENERATIONS": 20,
+        "VECTORIZED_GA": True,
+        "SEED": 4,
+        **settings,
+    })
+    runs = []
+    for batch in [False, True]:
+        mg.set_parameters({"BATCH_FITNESS": batch})
+        ga = mg.create_genetic_algorithm()
+        ga.set_profiling(True)
+        ga.run()
+
+        best = ga.get_best_genome()
+        assert best.get_score() == mg.fitness(best)
+        runs.append(([s["best"] for s in ga.get_generation_stats()], list(best.get_genome())))
+
+    assert ga.genomes == None
+    assert runs[0] == runs[1]
+
+
+def get_special_genomes(height, width):
+    # All walls, then a maze where the end cannot be reached (start and end empty)
+    if mg.METHOD_TO_USE == mg.USE_GENE_POOL_1:
+        walls = [mg.TILE_WALL] * (height * width)
+        unreachable = [mg.TILE_EMPTY] * (width * (height - 2)) + [mg.TILE_WALL] * width + [mg.TILE_EMPTY] * width
+        return [walls, unreachable]
+
+    count = (height // 3) * (width // 3)
+    return [[mg.STRUCT_HLINE] * count, [mg.STRUCT_VLINE] * count]
+
+
+@pytest.mark.parametrize("method, packed", [
+    (mg.USE_GENE_POOL_1, False),
+    (mg.USE_GENE_POOL_1, True),
+    (mg.USE_GENE_POOL_2, False),
+])
+def test_fitness_batch_matches_fitness(parameters, method, packed):
+    parameters({"METHOD_TO_USE": method, "MAZE_HEIGHT": 15, "MAZE_WIDTH": 21})
+    rng = random.Random(method)
+    genome_length, gene_pool = mg.get_genome_properties()
+
+    genomes = []
+    for genes in get_special_genomes(15, 21):
+        genome = Genome(genome_length, gene_pool, packed=packed)
+        genome.set_genome(BitGrid.from_list(genes) if packed else genes)
+        genomes.append(genome)
+
+    for i in range(300):
+        genome = Genome(genome_length, gene_pool, rng, packed)
+        genome.set_random_genome()
+        genomes.append(genome)
+
+    scores = [mg.fitness(genome) for genome in genomes]
+    assert mg.fitness_batch(genomes) == scores
+    assert mg.fitness_batch(mg.genomes_to_array(genomes)) == scores
+
+    # Special mazes: start is a wall, then the end cannot be reached
+    assert scores[0] == 0
+    assert 0 < scores[1] < mg.REWARD_PATH
+    assert any(score > mg.REWARD_PATH for score in scores)
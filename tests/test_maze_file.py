@@ -0,0 +1,76 @@
+from BitGrid import BitGrid
+import MazeFile as mf
+
+import random
+
+
+def get_mazes():
+    # Several sizes (tiles not a multiple of 8), a path going back up and left, an empty path
+    rng = random.Random(0)
+    mazes = []
+    for height, width in [(1, 1), (3, 5), (15, 15), (7, 9), (120, 200)]:
+        maze = [rng.randint(0, 1) for i in range(height * width)]
+        path = [[rng.randrange(height), rng.randrange(width)] for i in range(rng.randint(1, 50))]
+        mazes.append((height, width, maze, [0, 0], [height - 1, width - 1], path))
+
+    height, width = 15, 21
+    path = [[14, 20], [14, 19], [13, 19], [0, 0], [0, 1], [14, 20]]
+    mazes.append((height, width, BitGrid.from_list([1] * height * width), [14, 20], [0, 1], path))
+    mazes.append((height, width, [0] * height * width, [0, 1], [14, 19], []))
+    return mazes
+
+
+def check_records(reader, mazes):
+    assert len(reader) == len(mazes)
+    for record, (height, width, maze, start, end, path) in zip(reader, mazes):
+        assert (record.get_height(), record.get_width()) == (height, width)
+        assert record.get_maze() == list(maze)
+        assert record.get_start() == start
+        assert record.get_end() == end
+        assert record.get_path_locations() == path
+
+
+def test_archive_round_trip(tmp_path):
+    path = str(tmp_path / "mazes.maz")
+    mazes = get_mazes()
+
+    with mf.MazeWriter(path) as writer:
+        for maze in mazes:
+            writer.write(*maze)
+
+    with mf.MazeReader(path) as reader:
+        assert reader.offsets == None
+        check_records(reader, mazes)
+        assert reader.read_header(-1) == (15, 21, [0, 1], [14, 19])
+
+
+def test_path_deltas_are_zigzag_varints():
+    # Small moves in any direction are one byte, far jumps take more
+    width = 50
+    path = [[0, 5], [0, 4], [1, 4], [0, 4], [999, 49], [0, 0]]
+    data = mf.encode_path(path, width)
+
+    assert len(mf.encode_path(path[:4], width)) == 4
+    assert len(data) == 4 + 3 + 3
+    assert mf.decode_path(data, 0, len(path), width) == path
+    assert mf.encode_path([], width) == b""
+
+
+def test_archive_without_footer_is_scanned(tmp_path):
+    # Footer missing (e.g. writer not closed): complete records are found by scanning, a partial one is ignored
+    path = str(tmp_path / "mazes.maz")
+    mazes = get_mazes()
+
+    with mf.MazeWriter(path) as writer:
+        for maze in mazes:
+            writer.write(*maze)
+        last = writer.offsets[-1]
+
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:last + mf.RECORD_HEADER.size + 3])
+
+    with mf.MazeReader(path) as reader:
+        assert reader.offsets != None
+        check_records(reader, mazes[:-1])
@@ -0,0 +1,247 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+
+import MazeRenderer as mr
+
+import numpy as np
+import pytest
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Minimal GDMC HTTP interface: player position, block placement (PUT) and commands (POST)
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _should_fail(self, body):
+        # The first attempts of each request answer 503 (busy server)
+        server = self.server
+        with server.lock:
+            attempts = server.attempts.get(body, 0) + 1
+            server.attempts[body] = attempts
+            return attempts <= server.failures
+
+    def do_GET(self):
+        self._send([{"name": "player", "data": "{Pos:[10.5d,64.0d,-3.2d]}"}])
+
+    def do_PUT(self):
+        body = self._read()
+        blocks = json.loads(body)
+        if self._should_fail(body):
+            self._send({"message": "busy"}, 503)
+            return
+        with self.server.lock:
+            self.server.puts.append(blocks)
+        self._send([{"status": 1} for block in blocks])
+
+    def do_POST(self):
+        body = self._read()
+        commands = body.decode().split("\n")
+        if self._should_fail(body):
+            self._send({"message": "busy"}, 503)
+            return
+        with self.server.lock:
+            self.server.posts.append(commands)
+        self._send([{"status": 1, "message": ""} for command in commands])
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.attempts = {} # Attempts of each request body
+    server.failures = 0  # Failed attempts of each request body before it succeeds
+    server.puts = []
+    server.posts = []
+
+    uri = "http://127.0.0.1:" + str(server.server_address[1])
+    monkeypatch.setattr(mr, "URI_PLAYERS", uri + "/players?includeData=true")
+    monkeypatch.setattr(mr, "URI_BLOCK", uri + "/blocks")
+    monkeypatch.setattr(mr, "URI_COMMANDS", uri + "/commands")
+    monkeypatch.setattr(mr, "RETRY_DELAY", 0.0)
+
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get_world(puts):
+    # Blocks in the order the requests were received (air removes a block)
+    world = {}
+    for blocks in puts:
+        for block in blocks:
+            location = (block["x"], block["z"], block["y"])
+            if block["id"] == mr.BLOCK_TYPE_AIR:
+                world.pop(location, None)
+            else:
+                world[location] = block["id"]
+    return world
+
+
+def get_filled_world(posts):
+    # Blocks of the fill commands (corners included)
+    world = {}
+    for commands in posts:
+        for command in commands:
+            name, x1, y1, z1, x2, y2, z2, type = command.split(" ")
+            assert name == "fill"
+            x1, y1, z1, x2, y2, z2 = map(int, [x1, y1, z1, x2, y2, z2])
+            assert (x2 - x1 + 1) * (y2 - y1 + 1) * (z2 - z1 + 1) <= mr.MAX_FILL_VOLUME
+            for x in range(x1, x2 + 1):
+                for z in range(z1, z2 + 1):
+                    for y in range(y1, y2 + 1):
+                        world[(x, z, y)] = type
+    return world
+
+
+def get_maze(height=9, width=9, step=7):
+    # Walls on the start and end tiles, so their markers replace a wall block
+    maze = [(row * step + col * 3) % 4 == 0 for row in range(height) for col in range(width)]
+    maze = [int(tile) for tile in maze]
+    start, end = [0, 1], [height - 1, width - 2]
+    maze[start[0] * width + start[1]] = 1
+    maze[end[0] * width + end[1]] = 1
+    return mr.MazeRendered(height, width, maze, start, end, [])
+
+
+def get_random_maze(height, width, seed):
+    rng = random.Random(seed)
+    maze = [int(rng.random() < 0.6) for i in range(height * width)]
+    return mr.MazeRendered(height, width, maze, [0, 1], [height - 1, width - 2], [])
+
+
+def get_expected_world(maze, x, z, y):
+    world = {}
+    for block in maze._get_maze_blocks(x, z, y):
+        world[(block.x, block.z, block.y)] = mr.BLOCK_TYPE
+    for block in maze._get_surrounding_blocks(x, z, y):
+        world[(block.x, block.z, block.y)] = mr.BLOCK_TYPE_BORDER
+    block = maze._get_start_block(x, z, y)
+    world[(block.x, block.z, block.y)] = mr.BLOCK_TYPE_START
+    block = maze._get_end_block(x, z, y)
+    world[(block.x, block.z, block.y)] = mr.BLOCK_TYPE_END
+    return world
+
+
+@pytest.mark.parametrize("failures", [0, 2])
+def test_blocks_are_chunked_and_retried(stub, failures):
+    stub.failures = failures
+    maze = get_maze()
+    progress = []
+
+    with mr.MinecraftConnector(chunk_size=10, workers=4, retries=3, progress=lambda sent, total: progress.append((sent, total))) as mc:
+        maze.render_minecraft(False, mc)
+
+    x, z, y = int(10.5 - maze.width / 2), int(-3.2 + mr.GRID_OFFSET), 64
+    expected = get_expected_world(maze, x, z, y)
+
+    assert all(len(blocks) <= 10 for blocks in stub.puts)
+    assert get_world(stub.puts) == expected
+    assert progress[-1] == (2, 2)
+    assert (maze._get_block_count(), maze._get_block_count()) in progress
+
+
+def test_markers_are_placed_after_the_walls(stub):
+    maze = get_maze()
+
+    with mr.MinecraftConnector(chunk_size=7, workers=8, retries=0) as mc:
+        maze.render_minecraft(False, mc)
+
+    markers = [mr.BLOCK_TYPE_START, mr.BLOCK_TYPE_END]
+    last = stub.puts[-1]
+    assert sorted(block["id"] for block in last) == sorted(markers)
+    assert all(block["id"] not in markers for blocks in stub.puts[:-1] for block in blocks)
+
+
+def test_fill_commands_are_chunked(stub):
+    stub.failures = 1
+    maze = get_maze()
+
+    with mr.MinecraftConnector(chunk_size=5, workers=2, retries=2) as mc:
+        maze.render_minecraft(True, mc)
+
+    commands = [command for commands in stub.posts for command in commands]
+    assert all(len(commands) <= 5 for commands in stub.posts)
+    assert len(commands) == len(maze._get_maze_regions(0, 0, 0)) + len(maze._get_surrounding_regions(0, 0, 0))
+    assert all(command.startswith("fill ") for command in commands)
+
+
+def test_failing_chunk_raises(stub):
+    stub.failures = 2
+
+    with mr.MinecraftConnector(chunk_size=10, workers=2, retries=1) as mc:
+        with pytest.raises(Exception, match="Blocks cannot be placed"):
+            mc.add_blocks([mr.Position(0, 0, 0)], mr.BLOCK_TYPE)
+
+
+@pytest.mark.parametrize("size_a, size_b", [
+    ((9, 9), (9, 9)),
+    ((9, 9), (9, 15)),
+    ((9, 15), (12, 9)),
+])
+def test_render_state_sends_the_changes(stub, tmp_path, size_a, size_b):
+    # Re-render in place: the world must end like a fresh render of the new maze at the stored origin
+    state_path = str(tmp_path / "state.json")
+    maze_a = get_maze(*size_a, step=7)
+    maze_b = get_maze(*size_b, step=5)
+
+    with mr.MinecraftConnector(chunk_size=10, workers=4, retries=0) as mc:
+        maze_a.render_minecraft(False, mc, state_path)
+        previous, x, z, y, wall_height = mr.read_render_state(state_path)
+        count = len(stub.puts)
+
+        maze_b.render_minecraft(False, mc, state_path)
+
+    assert get_world(stub.puts) == get_expected_world(maze_b, x, z, y)
+    assert mr.read_render_state(state_path)[1:] == (x, z, y, wall_height)
+
+    # Only the changed blocks were sent
+    sent = sum(len(blocks) for blocks in stub.puts[count:])
+    assert sent < len(get_expected_world(maze_a, x, z, y)) + len(get_expected_world(maze_b, x, z, y))
+
+    # A fresh render would move a maze of another width (diff mode keeps the stored origin)
+    if size_a[1] != size_b[1]:
+        assert int(10.5 - maze_b.width / 2) != x
+
+
+@pytest.mark.parametrize("max_volume", [mr.MAX_FILL_VOLUME, 12])
+def test_fill_covers_the_same_blocks(stub, monkeypatch, max_volume):
+    # Fill regions (split when they are too big) and markers must build the per-block world
+    monkeypatch.setattr(mr, "MAX_FILL_VOLUME", max_volume)
+    for seed, (height, width) in enumerate([(9, 9), (15, 21), (30, 12)]):
+        maze = get_random_maze(height, width, seed)
+        stub.puts.clear()
+        stub.posts.clear()
+
+        with mr.MinecraftConnector(chunk_size=50, workers=4, retries=0) as mc:
+            maze.render_minecraft(True, mc)
+
+        x, z, y = int(10.5 - maze.width / 2), int(-3.2 + mr.GRID_OFFSET), 64
+        world = get_filled_world(stub.posts)
+        world.update(get_world(stub.puts))
+        assert world == get_expected_world(maze, x, z, y)
+
+
+def test_merged_tiles_cover_the_mask():
+    # Rectangles cover each true tile exactly once, and no false tile
+    rng = np.random.default_rng(0)
+    for density in [0.0, 0.3, 0.7, 1.0]:
+        mask = rng.random((17, 23)) < density
+        covered = np.zeros(mask.shape, dtype=int)
+        for row1, col1, row2, col2 in mr.merge_tiles(mask):
+            covered[row1:row2 + 1, col1:col2 + 1] += 1
+        assert (covered == mask).all()
@@ -0,0 +1,65 @@
+from GeneticAlgorithm import Genome
+from SearchAlgorithm import SearchAlgorithm, StructureSearchAlgorithm
+import MazeGenerator as mg
+
+import random
+
+import pytest
+
+
+def test_flat_search_is_reused(parameters):
+    parameters({"METHOD_TO_USE": mg.USE_GENE_POOL_1, "MAZE_HEIGHT": 15, "MAZE_WIDTH": 15})
+    rng = random.Random(0)
+    genome_length, gene_pool = mg.get_genome_properties()
+
+    for i in range(20):
+        genome = Genome(genome_length, gene_pool, rng)
+        genome.set_random_genome()
+
+        mg.set_parameters({"FAST_SEARCH": False})
+        expected = mg.fitness(genome)
+        mg.set_parameters({"FAST_SEARCH": True})
+        assert mg.fitness(genome) == expected
+
+    maze = mg.genome_to_maze(genome.get_genome())
+    assert mg.create_search_algorithm(maze, genome) is mg.create_search_algorithm(maze, genome)
+
+
+@pytest.mark.parametrize("size", [(15, 15), (9, 21), (12, 9)])
+def test_structure_search_matches_tile_search(parameters, size):
+    # Same path, steps and fitness metrics as the tile search on random Gene Pool 2 mazes
+    height, width = size
+    parameters({"METHOD_TO_USE": mg.USE_GENE_POOL_2, "MAZE_HEIGHT": height, "MAZE_WIDTH": width})
+    rng = random.Random(height * width)
+    genome_length, gene_pool = mg.get_genome_properties()
+
+    found = 0
+    for i in range(300):
+        genome = Genome(genome_length, gene_pool, rng)
+        genome.set_random_genome()
+        maze = mg.genome_to_maze(genome.get_genome())
+
+        expected = SearchAlgorithm(mg.MAZE_START, mg.MAZE_END, maze, mg.next_locations)
+        expected.run()
+        sa = StructureSearchAlgorithm(mg.MAZE_START, mg.MAZE_END, genome.get_genome(), height, width)
+        sa.run()
+
+        assert (sa.get_path() != None) == (expected.get_path() != None)
+        assert sa.get_path_locations() == expected.get_path_locations()
+        assert sa.get_steps() == expected.get_steps()
+        assert sa.get_expanded() == expected.get_expanded()
+        assert sa.get_closest_distance() == expected.get_closest_distance()
+        assert sa.get_explored() == expected.get_explored()
+        assert sa.get_revisited() == expected.get_revisited()
+        assert sa.get_explored_locations() == expected.get_explored_locations()
+        assert sorted(sa.get_explored_cells()) == sorted(r * width + c for r, c in expected.get_explored_locations())
+
+        # Same score through the fitness
+        mg.set_parameters({"STRUCTURE_SEARCH": True})
+        score = mg.fitness(genome)
+        mg.set_parameters({"STRUCTURE_SEARCH": False})
+        assert score == mg.fitness(genome)
+        found += sa.get_path() != None
+
+    # Both outcomes are covered
+    assert 0 < found < 300